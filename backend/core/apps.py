@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.contrib.auth.password_validation import get_default_password_validators
+        from django.db.backends.signals import connection_created
+        from core import signals  # noqa: F401
+        from core.metrics import install_query_recorder, instrument_serializers
+
+        connection_created.connect(install_query_recorder)
+        instrument_serializers()
+        # The validators are cached per process; loading them now keeps CommonPasswordValidator's list of
+        # 20,000 passwords from being read during the first registration.
+        get_default_password_validators()
@@ -0,0 +1,217 @@
+import asyncio
+import json
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Max
+from django.http import Http404, StreamingHttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from core.cache import CachedListMixin, get_cache, response_cache_key
+from core.export import EXPORT_CHUNK_SIZE
+from core.feed import get_channel_layer, changes_group
+from core.passwords import aauthenticate_credentials
+from core.models import Todo, Category, Change
+from core.serializers import TodoSerializer, CategorySerializer, CredentialsSerializer
+from core.views import (
+    LoginView,
+    TodoListCreateView,
+    TodoDetailUpdateDestroyView,
+    TodoExportView,
+    CategoryListCreateView,
+    CategoryDetailUpdateDestroyView,
+    ChangeFeedView,
+)
+
+CHANGE_FEED_BATCH_SIZE = 500
+
+
+class AsyncAPIView(View):
+    # Serves GET with the async ORM while reusing the DRF view's authentication, permissions, filters,
+    # pagination and serializers. Other methods are handed to the sync DRF view.
+    api_view_class = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Like DRF's views, these authenticate with tokens only and don't need CSRF protection.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def get(self, request, *args, **kwargs):
+        return await self.serve(request, *args, **kwargs)
+
+    async def serve(self, request, *args, **kwargs):
+        view = self.api_view_class(args=args, kwargs=kwargs)
+        request = view.initialize_request(request, *args, **kwargs)
+        view.request = request
+        view.headers = view.default_response_headers
+        try:
+            await sync_to_async(view.initial)(request, *args, **kwargs)
+            response = await self.respond(view, request)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        return await sync_to_async(view.finalize_response)(request, response, *args, **kwargs)
+
+    async def respond(self, view, request):
+        raise NotImplementedError
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(self.api_view_class.as_view())(request, *args, **kwargs)
+
+    post = put = patch = delete = options = delegate
+
+
+class AsyncListView(AsyncAPIView):
+    async def respond(self, view, request):
+        key = None
+        if isinstance(view, CachedListMixin) and settings.API_CACHE_ENABLED:
+            key = await sync_to_async(response_cache_key)(request, view.cache_prefix)
+            data = await get_cache().aget(key)
+            if data is not None:
+                return Response(data)
+
+        queryset = view.filter_queryset(view.get_queryset())
+        page = await view.paginator.apaginate_queryset(queryset, request, view)
+        serializer = view.get_serializer([row async for row in queryset] if page is None else page, many=True)
+        if hasattr(serializer, "aprefetch"):
+            await serializer.aprefetch()
+        if page is None:
+            response = Response(serializer.data)
+        else:
+            response = view.get_paginated_response(serializer.data)
+
+        if key is not None:
+            await get_cache().aset(key, response.data, timeout=settings.API_CACHE_TIMEOUT)
+        return response
+
+
+class AsyncDetailView(AsyncAPIView):
+    async def respond(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        try:
+            instance = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404
+        view.check_object_permissions(request, instance)
+        return Response(view.get_serializer(instance).data)
+
+
+class AsyncLoginView(AsyncAPIView):
+    # Checks the password in the bounded executor of core.passwords, so logins don't hold up the event loop
+    # or every worker thread while hashing. The token is then issued by the sync LoginView.
+    api_view_class = LoginView
+
+    async def post(self, request, *args, **kwargs):
+        return await self.serve(request, *args, **kwargs)
+
+    get = AsyncAPIView.delegate
+
+    async def respond(self, view, request):
+        serializer = CredentialsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = await aauthenticate_credentials(**serializer.validated_data)
+        if user is None:
+            raise ValidationError({"non_field_errors": [CredentialsSerializer.invalid_message]}, code="authorization")
+        return await sync_to_async(view.log_in)(request, user)
+
+
+class AsyncTodoListCreateView(AsyncListView):
+    api_view_class = TodoListCreateView
+
+
+class AsyncTodoDetailUpdateDestroyView(AsyncDetailView):
+    api_view_class = TodoDetailUpdateDestroyView
+
+
+class AsyncTodoExportView(AsyncAPIView):
+    # Django would load a sync iterator into memory to serve it under ASGI, so stream with the async ORM.
+    api_view_class = TodoExportView
+
+    async def respond(self, view, request):
+        queryset = view.filter_queryset(view.get_queryset())
+        serializer = view.get_serializer()
+        rows = (serializer.to_representation(todo) async for todo in queryset.aiterator(chunk_size=EXPORT_CHUNK_SIZE))
+        return view.export_response(request.accepted_renderer.achunks(rows))
+
+
+class AsyncCategoryListCreateView(AsyncListView):
+    api_view_class = CategoryListCreateView
+
+
+class AsyncCategoryDetailUpdateDestroyView(AsyncDetailView):
+    api_view_class = CategoryDetailUpdateDestroyView
+
+
+async def change_events(user, changes):
+    ids = defaultdict(set)
+    for change in changes:
+        if change.action != "deleted":
+            ids[change.model].add(change.object_id)
+    todos = Todo.objects.filter(owner=user, id__in=ids["todo"]).prefetch_related("category")
+    categories = Category.objects.filter(owner=user, id__in=ids["category"])
+    todos = {todo.id: todo async for todo in todos}
+    categories = {category.id: category async for category in categories}
+    objects = {"todo": (todos, TodoSerializer), "category": (categories, CategorySerializer)}
+
+    events = []
+    for change in changes:
+        instances, serializer_class = objects[change.model]
+        instance = instances.get(change.object_id)
+        data = {"id": change.object_id, change.model: serializer_class(instance).data if instance else None}
+        events.append(f"id: {change.id}\nevent: {change.model}.{change.action}\ndata: {json.dumps(data)}\n\n")
+    return events
+
+
+async def change_stream(user, last_event_id):
+    # Sends the changes after last_event_id, then waits for new ones. Notifications from the channel layer
+    # wake the stream up early; otherwise the change log is re-read on every heartbeat.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.CHANGE_FEED_MAX_DURATION
+    async with get_channel_layer().subscribe(changes_group(user.pk)) as notifications:
+        while True:
+            queryset = Change.objects.filter(owner=user, id__gt=last_event_id)[:CHANGE_FEED_BATCH_SIZE]
+            changes = [change async for change in queryset]
+            if changes:
+                for event in await change_events(user, changes):
+                    yield event
+                last_event_id = changes[-1].id
+                continue
+            if loop.time() >= deadline:
+                return
+            try:
+                timeout = min(settings.CHANGE_FEED_HEARTBEAT, deadline - loop.time())
+                await asyncio.wait_for(notifications.get(), timeout)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+
+
+class AsyncChangeFeedView(AsyncAPIView):
+    # Server-sent events for every change to the user's todos and categories. Clients resume with the
+    # Last-Event-ID header (or ?last_event_id=); without it the stream starts at the latest change.
+    api_view_class = ChangeFeedView
+
+    async def respond(self, view, request):
+        # Under WSGI the stream would only be sent once it closes, holding a worker for
+        # CHANGE_FEED_MAX_DURATION seconds.
+        if not isinstance(request._request, ASGIRequest):
+            return Response(
+                {"detail": "The change feed needs the ASGI server."}, status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+
+        last_event_id = request.headers.get("Last-Event-ID", request.query_params.get("last_event_id"))
+        if last_event_id is None:
+            latest = await Change.objects.filter(owner=request.user).aaggregate(last=Max("id"))
+            last_event_id = str(latest["last"] or 0)
+        elif not last_event_id.isdigit():
+            raise ValidationError({"last_event_id": ["A valid integer is required."]})
+
+        response = StreamingHttpResponse(
+            change_stream(request.user, int(last_event_id)), content_type="text/event-stream"
+        )
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
@@ -0,0 +1,86 @@
+import binascii
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import get_token_model
+from knox.settings import knox_settings
+from rest_framework import exceptions
+from core.routers import read_own_writes
+
+
+def get_auth_cache():
+    return caches[settings.AUTH_CACHE_ALIAS]
+
+
+def token_cache_key(digest):
+    return f"auth:token:{digest}"
+
+
+def forget_tokens(digests):
+    get_auth_cache().delete_many([token_cache_key(digest) for digest in digests])
+
+
+class ExpiryRefresher:
+    # Collects the tokens seen on cache hits and renews their expiry with a single UPDATE once
+    # AUTH_REFRESH_BATCH_SIZE tokens are pending or knox's MIN_REFRESH_INTERVAL has passed.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.flushed_at = time.monotonic()
+
+    def touch(self, digest):
+        with self.lock:
+            self.pending.add(digest)
+            due = time.monotonic() - self.flushed_at >= knox_settings.MIN_REFRESH_INTERVAL
+            if not due and len(self.pending) < settings.AUTH_REFRESH_BATCH_SIZE:
+                return
+            digests, self.pending, self.flushed_at = self.pending, set(), time.monotonic()
+        self.flush(digests)
+
+    def flush(self, digests):
+        expiry = timezone.now() + knox_settings.TOKEN_TTL
+        if knox_settings.AUTO_REFRESH_MAX_TTL is not None:
+            expiry = Least(F("created") + knox_settings.AUTO_REFRESH_MAX_TTL, expiry)
+        get_token_model().objects.filter(digest__in=digests, expiry__isnull=False).update(expiry=expiry)
+
+
+expiry_refresher = ExpiryRefresher()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    # Knox's TokenAuthentication with verified tokens cached by digest in the AUTH_CACHE_ALIAS cache (a
+    # bounded LRU by default) for AUTH_CACHE_TIMEOUT seconds. Entries are dropped when the token is
+    # deleted, e.g. by knox's LogoutView, or when its user changes (see core.signals).
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            read_own_writes(result[0].pk)
+        return result
+
+    def authenticate_credentials(self, token):
+        try:
+            digest = hash_token(token.decode("utf-8"))
+        except (TypeError, UnicodeDecodeError, binascii.Error):
+            raise exceptions.AuthenticationFailed("Invalid token.")
+
+        cached = get_auth_cache().get(token_cache_key(digest))
+        if cached is not None:
+            user, auth_token = cached
+            if auth_token.expiry is None or auth_token.expiry > timezone.now():
+                if knox_settings.AUTO_REFRESH and auth_token.expiry:
+                    expiry_refresher.touch(digest)
+                return user, auth_token
+
+        user, auth_token = super().authenticate_credentials(token)
+        timeout = settings.AUTH_CACHE_TIMEOUT
+        if auth_token.expiry is not None:
+            timeout = min(timeout, (auth_token.expiry - timezone.now()).total_seconds())
+        if timeout > 0:
+            get_auth_cache().set(token_cache_key(digest), (user, auth_token), timeout=timeout)
+        return user, auth_token
@@ -0,0 +1,216 @@
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+from core.models import Todo, Category
+
+WORDS = [
+    "buy",
+    "call",
+    "email",
+    "fix",
+    "plan",
+    "read",
+    "review",
+    "write",
+    "groceries",
+    "report",
+    "meeting",
+    "invoice",
+    "garden",
+    "dentist",
+    "budget",
+    "project",
+]
+
+
+@contextmanager
+def explicit_created_at():
+    # auto_now_add would stamp every seeded row with the same time, so let the seeder set it.
+    field = Todo._meta.get_field("created_at")
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def seed_user(username, todo_count, category_count=10, days=365, batch_size=10_000, seed=0):
+    rng = random.Random(f"{seed}-{username}")
+    user, _ = User.objects.get_or_create(username=username)
+    categories = [
+        Category.objects.get_or_create(name=f"Category {index}", owner=user)[0] for index in range(category_count)
+    ]
+    existing = Todo.objects.filter(owner=user).count()
+    start = timezone.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(todo_count, 1)
+    through = Todo.category.through
+
+    with explicit_created_at():
+        for offset in range(existing, todo_count, batch_size):
+            todos = Todo.objects.bulk_create(
+                [
+                    Todo(
+                        description=" ".join(rng.choices(WORDS, k=3)),
+                        is_completed=rng.random() < 0.3,
+                        owner=user,
+                        created_at=start + step * index,
+                    )
+                    for index in range(offset, min(offset + batch_size, todo_count))
+                ]
+            )
+            if categories:
+                through.objects.bulk_create(
+                    [through(todo_id=todo.id, category_id=rng.choice(categories).id) for todo in todos]
+                )
+    return user
+
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))]
+
+
+def summarize(samples):
+    return {
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+
+
+def measure(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+def http_request(url, method="GET", data=None, headers=None):
+    body = json.dumps(data).encode() if data is not None else None
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    request = urllib.request.Request(url, data=body, method=method, headers=headers)
+    with urllib.request.urlopen(request) as response:
+        return response.status, response.read()
+
+
+def login(base_url, username, password):
+    _, body = http_request(f"{base_url}/api/login/", "POST", {"username": username, "password": password})
+    return {"Authorization": f"Token {json.loads(body)['token']}"}
+
+
+def load_test(url, headers, requests, concurrency):
+    def timed_request(_):
+        started = time.perf_counter()
+        http_request(url, headers=headers)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed_request, range(requests)))
+    return {**summarize(samples), "rps": requests / (time.perf_counter() - started)}
+
+
+# Relative weights of the operations in a benchmark run. The frontend loads the category sidebar along with
+# every todo list, so categories weigh as much as list.
+DEFAULT_MIX = {"list": 30, "categories": 30, "filter": 20, "search": 15, "create": 10, "patch": 15, "login": 10}
+
+
+def seed_users(prefix, user_count, todo_count, category_count, password):
+    users = [seed_user(f"{prefix}{index}", todo_count, category_count) for index in range(user_count)]
+    # Hashing once instead of per user keeps seeding fast.
+    User.objects.filter(id__in=[user.id for user in users]).update(password=make_password(password))
+    return [
+        {
+            "username": user.username,
+            "password": password,
+            "todo_ids": list(Todo.objects.filter(owner=user).values_list("id", flat=True)[:1000]),
+            "category_ids": list(Category.objects.filter(owner=user).values_list("id", flat=True)),
+        }
+        for user in users
+    ]
+
+
+def operation_request(name, user, rng):
+    last_month = (timezone.now() - timedelta(days=30)).date().isoformat()
+    if name == "list":
+        return "GET", "/api/todos/", None
+    if name == "filter":
+        category = f"&category={rng.choice(user['category_ids'])}" if user["category_ids"] else ""
+        return "GET", f"/api/todos/?is_completed=false&created_at_after={last_month}{category}", None
+    if name == "categories":
+        return "GET", "/api/categories/?counts=true", None
+    if name == "search":
+        return "GET", f"/api/todos/?search={rng.choice(WORDS)}", None
+    if name == "create":
+        return "POST", "/api/todos/", {"description": " ".join(rng.choices(WORDS, k=3))}
+    if name == "patch":
+        return "PATCH", f"/api/todos/{rng.choice(user['todo_ids'])}/", {"is_completed": rng.random() < 0.5}
+    if name == "login":
+        return "POST", "/api/login/", {"username": user["username"], "password": user["password"]}
+    raise ValueError(f"Unknown operation {name!r}.")
+
+
+def run_mix(base_url, users, mix, requests, concurrency, seed=0):
+    # Sends `requests` requests picked from the weighted mix, each as a random seeded user, and reports the
+    # latency percentiles and throughput per operation and overall.
+    for user in users:
+        user["headers"] = login(base_url, user["username"], user["password"])
+    rng = random.Random(seed)
+    plan = [
+        (name, rng.choice(users), random.Random(rng.random()))
+        for name in rng.choices(list(mix), weights=list(mix.values()), k=requests)
+    ]
+
+    def timed_request(step):
+        name, user, step_rng = step
+        method, path, data = operation_request(name, user, step_rng)
+        started = time.perf_counter()
+        try:
+            http_request(base_url + path, method, data, user["headers"])
+            failed = False
+        except (urllib.error.URLError, OSError):
+            failed = True
+        return name, (time.perf_counter() - started) * 1000, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(timed_request, plan))
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in sorted({name for name, _, _ in samples}):
+        timings = [timing for sample_name, timing, _ in samples if sample_name == name]
+        errors = sum(failed for sample_name, _, failed in samples if sample_name == name)
+        results[name] = {
+            **summarize(timings),
+            "rps": len(timings) / elapsed,
+            "requests": len(timings),
+            "errors": errors,
+        }
+    total = {**summarize([timing for _, timing, _ in samples]), "rps": requests / elapsed, "requests": requests}
+    results["total"] = {**total, "errors": sum(failed for _, _, failed in samples)}
+    return results
+
+
+def compare_results(baseline, results, threshold):
+    # A regression is a p95 latency or a throughput more than `threshold` (a fraction) worse than the baseline.
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current["p95"] > previous["p95"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95']:.2f}ms -> {current['p95']:.2f}ms")
+        if current["rps"] < previous["rps"] * (1 - threshold):
+            regressions.append(f"{name}: {previous['rps']:.1f} -> {current['rps']:.1f} req/s")
+    return regressions
@@ -0,0 +1,156 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from core.models import Todo, Category
+from core.changes import collect_changes, record_change
+from core.signals import owner_changed
+from core.stats import adjust_stats, collect_stats
+from core.serializers import TodoSerializer, BulkCreateTodoSerializer, BulkUpdateTodoSerializer
+
+CATEGORY_OWNER_ERROR = "All categories must belong to the todo owner."
+
+
+def item_error(index, code, errors):
+    return {"index": index, "status": code, "errors": errors}
+
+
+def validate_items(serializer_class, items):
+    results, valid = [None] * len(items), {}
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            valid[index] = serializer.validated_data
+        else:
+            results[index] = item_error(index, status.HTTP_400_BAD_REQUEST, serializer.errors)
+    return results, valid
+
+
+def reject_foreign_categories(user, results, valid):
+    # One query for the whole batch instead of one per category, compared by id.
+    requested = {category_id for data in valid.values() for category_id in data.get("category", [])}
+    owned = set()
+    if requested:
+        owned = set(Category.objects.filter(owner=user, id__in=requested).values_list("id", flat=True))
+    for index, data in list(valid.items()):
+        if not set(data.get("category", [])) <= owned:
+            results[index] = item_error(index, status.HTTP_400_BAD_REQUEST, {"category": [CATEGORY_OWNER_ERROR]})
+            del valid[index]
+
+
+def replace_categories(todo_categories):
+    through = Todo.category.through
+    through.objects.filter(todo_id__in=todo_categories).delete()
+    through.objects.bulk_create(
+        [
+            through(todo_id=todo_id, category_id=category_id)
+            for todo_id, category_ids in todo_categories.items()
+            for category_id in set(category_ids)
+        ]
+    )
+
+
+def count_todo(user, is_completed, category_ids, sign):
+    # bulk_create and bulk_update don't send signals, so the counters are adjusted here instead.
+    adjust_stats("owner", user.pk, sign, sign * int(is_completed))
+    for category_id in set(category_ids):
+        adjust_stats("category", category_id, sign, sign * int(is_completed))
+
+
+def serialize_todos(ids):
+    todos = Todo.objects.filter(id__in=ids).prefetch_related("category").in_bulk()
+    return {todo_id: TodoSerializer(todo).data for todo_id, todo in todos.items()}
+
+
+def bulk_create_todos(user, items):
+    results, valid = validate_items(BulkCreateTodoSerializer, items)
+    reject_foreign_categories(user, results, valid)
+
+    with transaction.atomic(), collect_changes(), collect_stats():
+        todos = Todo.objects.bulk_create(
+            [
+                Todo(owner=user, **{key: value for key, value in data.items() if key != "category"})
+                for data in valid.values()
+            ]
+        )
+        replace_categories(
+            {todo.id: data["category"] for todo, data in zip(todos, valid.values()) if data.get("category")}
+        )
+        owner_changed(user.pk)
+        for todo, data in zip(todos, valid.values()):
+            record_change(user.pk, "todo", todo.id, "created")
+            count_todo(user, todo.is_completed, data.get("category", []), 1)
+
+    created = serialize_todos([todo.id for todo in todos])
+    for index, todo in zip(valid, todos):
+        results[index] = {"index": index, "status": status.HTTP_201_CREATED, "todo": created[todo.id]}
+    return results
+
+
+def bulk_update_todos(user, items):
+    results, valid = validate_items(BulkUpdateTodoSerializer, items)
+    reject_foreign_categories(user, results, valid)
+
+    todos = Todo.objects.filter(owner=user, id__in=[data["id"] for data in valid.values()]).in_bulk()
+    updated, fields, todo_categories, seen = {}, set(), {}, set()
+    for index, data in valid.items():
+        todo = todos.get(data["id"])
+        if todo is None:
+            results[index] = item_error(index, status.HTTP_404_NOT_FOUND, {"detail": "Not found."})
+            continue
+        if todo.id in seen:
+            results[index] = item_error(index, status.HTTP_400_BAD_REQUEST, {"id": ["Duplicate id."]})
+            continue
+        seen.add(todo.id)
+        for attr in ("description", "is_completed"):
+            if attr in data:
+                setattr(todo, attr, data[attr])
+                fields.add(attr)
+        if "category" in data:
+            todo_categories[todo.id] = data["category"]
+        updated[index] = todo
+
+    now = timezone.now()
+    for todo in updated.values():
+        todo.updated_at = now
+    with transaction.atomic(), collect_changes(), collect_stats():
+        # Each todo is counted out with its saved state and back in with the new one.
+        counted = [
+            todo
+            for todo in updated.values()
+            if todo.id in todo_categories or todo.is_completed != todo._loaded_is_completed
+        ]
+        links = Todo.category.through.objects.filter(todo_id__in=[todo.id for todo in counted])
+        saved_categories = {}
+        for todo_id, category_id in links.values_list("todo_id", "category_id"):
+            saved_categories.setdefault(todo_id, []).append(category_id)
+        for todo in counted:
+            categories = saved_categories.get(todo.id, [])
+            count_todo(user, todo._loaded_is_completed, categories, -1)
+            count_todo(user, todo.is_completed, todo_categories.get(todo.id, categories), 1)
+
+        if updated:
+            Todo.objects.bulk_update(updated.values(), sorted(fields | {"updated_at"}))
+        replace_categories(todo_categories)
+        owner_changed(user.pk)
+        for todo in updated.values():
+            record_change(user.pk, "todo", todo.id, "updated")
+
+    serialized = serialize_todos([todo.id for todo in updated.values()])
+    for index, todo in updated.items():
+        results[index] = {"index": index, "status": status.HTTP_200_OK, "todo": serialized[todo.id]}
+    return results
+
+
+def bulk_delete_todos(user, ids):
+    with transaction.atomic(), collect_changes(), collect_stats():
+        queryset = Todo.objects.filter(owner=user, id__in=ids)
+        found = set(queryset.values_list("id", flat=True))
+        queryset.prefetch_related("category").delete()
+    return [
+        (
+            {"index": index, "id": todo_id, "status": status.HTTP_204_NO_CONTENT}
+            if todo_id in found
+            else item_error(index, status.HTTP_404_NOT_FOUND, {"detail": "Not found."})
+        )
+        for index, todo_id in enumerate(ids)
+    ]
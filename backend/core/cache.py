@@ -0,0 +1,100 @@
+import hashlib
+import time
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.core.cache import caches
+from django.utils.http import urlencode
+from rest_framework.response import Response
+from core.compression import strip_etag_encodings
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def version_key(user_id):
+    return f"api:version:{user_id}"
+
+
+def get_user_version(user_id):
+    # Versions are the time of the user's last write in nanoseconds, so they double as Last-Modified
+    # and a version key that was evicted never comes back with a value older responses were cached under.
+    cache = get_cache()
+    cache.add(version_key(user_id), time.time_ns(), timeout=None)
+    return cache.get(version_key(user_id))
+
+
+def bump_user_version(user_id):
+    get_cache().set(version_key(user_id), time.time_ns(), timeout=None)
+
+
+def response_cache_key(request, prefix):
+    params = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.md5(f"{request.get_host()}?{params}".encode()).hexdigest()
+    return f"api:{prefix}:{request.user.pk}:{get_user_version(request.user.pk)}:{digest}"
+
+
+class CachedListMixin:
+    # Caches list responses per user and query string. Any write to the user's todos or categories bumps
+    # their version (see core.signals), which moves every lookup to a new key.
+    cache_prefix = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_CACHE_ENABLED:
+            return super().list(request, *args, **kwargs)
+        key = response_cache_key(request, self.cache_prefix)
+        data = get_cache().get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        get_cache().set(key, response.data, timeout=settings.API_CACHE_TIMEOUT)
+        return response
+
+
+class PreconditionResponse(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalMixin:
+    # Strong ETags and Last-Modified derived from the user's version, so If-None-Match and If-Match are
+    # answered (304/412) right after authentication, before the object is loaded or serialized.
+    # Last-Modified only has whole seconds, so it is left out while the user's last write is in the current
+    # second: another write in that second would keep the same date and If-Modified-Since would hide it.
+    def get_etag(self, request):
+        version = get_user_version(request.user.pk)
+        digest = hashlib.md5(f"{request.user.pk}:{version}:{request.get_full_path()}".encode()).hexdigest()
+        last_modified = version // 1_000_000_000
+        if last_modified >= int(time.time()):
+            last_modified = None
+        return f'"{digest}"', last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not settings.API_CACHE_ENABLED:
+            return
+        # The ETags of compressed responses name the encoding too (see core.compression), which doesn't
+        # change the version they were sent for.
+        for header in ("HTTP_IF_MATCH", "HTTP_IF_NONE_MATCH"):
+            if header in request.META:
+                request.META[header] = strip_etag_encodings(request.META[header])
+        etag, last_modified = self.get_etag(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            raise PreconditionResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, PreconditionResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        succeeded = response.status_code < 300 or response.status_code == 304
+        if request.method in ("GET", "HEAD", "PUT", "PATCH") and succeeded and settings.API_CACHE_ENABLED:
+            etag, last_modified = self.get_etag(request)
+            response.headers["ETag"] = etag
+            if last_modified is not None:
+                response.headers["Last-Modified"] = http_date(last_modified)
+        return response
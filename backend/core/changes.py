@@ -0,0 +1,40 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from django.db import transaction
+from core.feed import publish_changes
+from core.models import Change
+
+pending_changes = ContextVar("pending_changes", default=None)
+
+
+def save_changes(changes):
+    Change.objects.bulk_create(changes)
+    transaction.on_commit(partial(publish_changes, {change.owner_id for change in changes}))
+
+
+def record_change(owner_id, model, object_id, action):
+    pending = pending_changes.get()
+    if pending is None:
+        save_changes([Change(owner_id=owner_id, model=model, object_id=object_id, action=action)])
+        return
+    previous = pending.get((model, object_id))
+    if previous is not None and previous.action == "created" and action == "updated":
+        return
+    pending[(model, object_id)] = Change(owner_id=owner_id, model=model, object_id=object_id, action=action)
+
+
+@contextmanager
+def collect_changes():
+    # Changes recorded inside the block are merged per object and saved with one INSERT when it exits.
+    if pending_changes.get() is not None:
+        yield
+        return
+    token = pending_changes.set({})
+    try:
+        yield
+        pending = pending_changes.get()
+    finally:
+        pending_changes.reset(token)
+    if pending:
+        save_changes(list(pending.values()))
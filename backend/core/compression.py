@@ -0,0 +1,64 @@
+import gzip
+import re
+import brotli
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+# Fast levels, since responses are compressed on every request.
+COMPRESSORS = {
+    "br": lambda content: brotli.compress(content, quality=4),
+    "gzip": lambda content: gzip.compress(content, compresslevel=6, mtime=0),
+}
+
+
+# Compressed responses get their own strong ETag, "<etag>-<encoding>", as validators of different
+# representations must differ. ConditionalMixin strips the suffix before comparing.
+encoded_etag_suffix = re.compile('-(?:%s)"' % "|".join(COMPRESSORS))
+
+
+def strip_etag_encodings(header):
+    return encoded_etag_suffix.sub('"', header)
+
+
+def accepted_encoding(header):
+    # The encoding of COMPRESSORS the client prefers in Accept-Encoding, brotli first when they tie.
+    weights = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        weight = 1.0
+        if params.strip().startswith("q="):
+            try:
+                weight = float(params.strip()[2:])
+            except ValueError:
+                continue
+        weights[name] = weight
+    candidates = [(weights.get(name, weights.get("*", 0)), name) for name in COMPRESSORS]
+    weight, name = max(candidates, key=lambda candidate: candidate[0])
+    return name if weight > 0 else None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    # Compresses responses of COMPRESSION_MIN_SIZE bytes or more with brotli or gzip, as negotiated with
+    # Accept-Encoding. Streamed responses (the export, import and change feed) are sent as they are.
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = accepted_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        content = COMPRESSORS[encoding](response.content)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+        response.headers["Content-Encoding"] = encoding
+        response.headers["Content-Length"] = str(len(content))
+        return response
@@ -0,0 +1,40 @@
+import pytest
+from core.queries import queries_inspected
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "no_n_plus_one: fail when a request runs a statement QUERY_REPEAT_THRESHOLD times or more"
+    )
+    config.addinivalue_line("markers", "query_budget(n): fail when a request runs more than n queries")
+
+
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    # Checks the queries of every request made by tests marked with no_n_plus_one or query_budget, as
+    # reported by PerformanceMiddleware (see core/queries.py).
+    no_n_plus_one = item.get_closest_marker("no_n_plus_one")
+    budget = item.get_closest_marker("query_budget")
+    if not no_n_plus_one and not budget:
+        return (yield)
+
+    reports = []
+
+    def collect(sender, report, **kwargs):
+        reports.append(report)
+
+    queries_inspected.connect(collect)
+    try:
+        result = yield
+    finally:
+        queries_inspected.disconnect(collect)
+
+    problems = []
+    for report in reports:
+        if no_n_plus_one and report.repeated:
+            problems.append(str(report))
+        if budget and report.count > budget.args[0]:
+            problems.append(f"{report.label}: {report.count} queries, the budget is {budget.args[0]}")
+    if problems:
+        pytest.fail("\n".join(problems), pytrace=False)
+    return result
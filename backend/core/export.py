@@ -0,0 +1,81 @@
+import csv
+import json
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+EXPORT_CHUNK_SIZE = 2000
+# Rows are joined into chunks of this size before they are written to the response.
+EXPORT_ROWS_PER_WRITE = 200
+
+
+def dumps(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+
+
+class Echo:
+    # A file-like object for csv.writer that returns the line instead of writing it.
+    def write(self, value):
+        return value
+
+
+class ExportRenderer(BaseRenderer):
+    # Renders an export row by row, so it can be streamed without loading every todo at once.
+    charset = "utf-8"
+    header = footer = ""
+
+    def render_row(self, data, index):
+        raise NotImplementedError
+
+    def chunks(self, rows):
+        parts = [self.header]
+        for index, row in enumerate(rows):
+            parts.append(self.render_row(row, index))
+            if len(parts) >= EXPORT_ROWS_PER_WRITE:
+                yield "".join(parts)
+                parts = []
+        parts.append(self.footer)
+        yield "".join(parts)
+
+    async def achunks(self, rows):
+        parts = [self.header]
+        index = 0
+        async for row in rows:
+            parts.append(self.render_row(row, index))
+            index += 1
+            if len(parts) >= EXPORT_ROWS_PER_WRITE:
+                yield "".join(parts)
+                parts = []
+        parts.append(self.footer)
+        yield "".join(parts)
+
+
+class NDJSONExportRenderer(ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render_row(self, data, index):
+        return dumps(data) + "\n"
+
+
+class JSONExportRenderer(ExportRenderer):
+    media_type = "application/json"
+    format = "json"
+    header = "["
+    footer = "]"
+
+    def render_row(self, data, index):
+        return ("," if index else "") + dumps(data)
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    fields = ["id", "description", "is_completed", "category", "created_at", "updated_at"]
+
+    def __init__(self):
+        self.writer = csv.writer(Echo())
+        self.header = self.writer.writerow(self.fields)
+
+    def render_row(self, data, index):
+        data = {**data, "category": ";".join(category["name"] for category in data["category"])}
+        return self.writer.writerow([data[field] for field in self.fields])
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import cache
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class InMemoryChannelLayer:
+    # Delivers messages to subscribers in this process only. Feed streams also re-read the change log
+    # on every heartbeat, so changes made by other processes arrive late instead of being lost. A layer
+    # backed by a broker only has to provide the same subscribe/publish pair.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+
+    @asynccontextmanager
+    async def subscribe(self, group):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self.lock:
+            self.subscribers[group].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self.lock:
+                self.subscribers[group].discard(subscriber)
+                if not self.subscribers[group]:
+                    del self.subscribers[group]
+
+    def publish(self, group, message):
+        with self.lock:
+            subscribers = list(self.subscribers.get(group, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                pass
+
+
+@cache
+def get_channel_layer():
+    return import_string(settings.CHANGE_FEED_LAYER)()
+
+
+def changes_group(owner_id):
+    return f"changes.{owner_id}"
+
+
+def publish_changes(owner_ids):
+    for owner_id in owner_ids:
+        get_channel_layer().publish(changes_group(owner_id), {"type": "changes"})
@@ -2,12 +2,23 @@ from django_filters import rest_framework as filters
 from core.models import Todo
 
 
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
 class TodoFilter(filters.FilterSet):
     description = filters.CharFilter(lookup_expr="icontains")
     is_completed = filters.BooleanFilter()
     created_at = filters.DateFromToRangeFilter()
-    category = filters.CharFilter(field_name="category__name", lookup_expr="icontains")
+    # Comma separated category ids, matched in a subquery on the m2m table, so neither the categories nor
+    # DISTINCT are needed. category_name keeps the former substring match on names.
+    category = NumberInFilter(method="filter_category")
+    category_name = filters.CharFilter(field_name="category__name", lookup_expr="icontains")
 
     class Meta:
         model = Todo
-        fields = ["description", "is_completed", "created_at", "category"]
+        fields = ["description", "is_completed", "created_at", "category", "category_name"]
+
+    def filter_category(self, queryset, name, value):
+        todos = Todo.category.through.objects.filter(category_id__in=value)
+        return queryset.filter(id__in=todos.values("todo_id"))
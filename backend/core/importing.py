@@ -0,0 +1,100 @@
+import codecs
+import csv
+import json
+from itertools import islice
+from django.db import transaction
+from core.bulk import count_todo
+from core.changes import collect_changes, record_change
+from core.models import Todo, Category
+from core.serializers import ImportTodoSerializer
+from core.signals import owner_changed
+from core.stats import collect_stats
+
+IMPORT_BATCH_SIZE = 1000
+
+
+def read_ndjson(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def read_csv(lines):
+    # Same columns as the CSV export, with the category names separated by semicolons. Other columns are ignored.
+    reader = csv.DictReader(lines)
+    for row in reader:
+        item = {key: value for key, value in row.items() if key is not None and value is not None}
+        if "category" in item:
+            item["category"] = [name.strip() for name in item["category"].split(";") if name.strip()]
+        yield reader.line_num, item
+
+
+READERS = {"ndjson": read_ndjson, "csv": read_csv}
+
+
+def read_rows(file, format):
+    # Uploads are read line by line, so large files are never loaded into memory at once.
+    return READERS[format](codecs.iterdecode(file, "utf-8-sig", errors="replace"))
+
+
+def upsert_categories(user, names):
+    categories = dict(Category.objects.filter(owner=user, name__in=names).values_list("name", "id"))
+    missing = names - categories.keys()
+    if missing:
+        # ignore_conflicts lets a concurrent import create the same name, so the ids are read back afterwards.
+        Category.objects.bulk_create([Category(name=name, owner=user) for name in missing], ignore_conflicts=True)
+        created = dict(Category.objects.filter(owner=user, name__in=missing).values_list("name", "id"))
+        for category_id in created.values():
+            record_change(user.pk, "category", category_id, "created")
+        categories.update(created)
+    return categories
+
+
+def import_batch(user, items):
+    through = Todo.category.through
+    with transaction.atomic(), collect_changes(), collect_stats():
+        categories = upsert_categories(user, {name for data in items for name in data.get("category", [])})
+        todos = Todo.objects.bulk_create(
+            [Todo(owner=user, **{key: value for key, value in data.items() if key != "category"}) for data in items]
+        )
+        through.objects.bulk_create(
+            [
+                through(todo_id=todo.id, category_id=categories[name])
+                for todo, data in zip(todos, items)
+                for name in set(data.get("category", []))
+            ]
+        )
+        owner_changed(user.pk)
+        for todo, data in zip(todos, items):
+            record_change(user.pk, "todo", todo.id, "created")
+            count_todo(user, todo.is_completed, [categories[name] for name in data.get("category", [])], 1)
+
+
+def import_todos(user, rows):
+    # Imports the rows in batches of IMPORT_BATCH_SIZE, each in its own transaction, and yields an error for
+    # every invalid row and the progress after every batch.
+    processed = created = failed = 0
+    rows = iter(rows)
+    while batch := list(islice(rows, IMPORT_BATCH_SIZE)):
+        valid = []
+        for line, item in batch:
+            if item is None:
+                errors = {"non_field_errors": ["Invalid JSON."]}
+            else:
+                serializer = ImportTodoSerializer(data=item)
+                if serializer.is_valid():
+                    valid.append(serializer.validated_data)
+                    continue
+                errors = serializer.errors
+            failed += 1
+            yield {"line": line, "errors": errors}
+        if valid:
+            import_batch(user, valid)
+        processed += len(batch)
+        created += len(valid)
+        yield {"processed": processed, "created": created, "failed": failed, "done": False}
+    yield {"processed": processed, "created": created, "failed": failed, "done": True}
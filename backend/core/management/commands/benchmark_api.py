@@ -0,0 +1,76 @@
+import json
+import subprocess
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from core.benchmarks import DEFAULT_MIX, seed_users, run_mix, compare_results
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed benchmark users and run a mix of list, filter, search, create, patch and login requests against a "
+        "running server, reporting p50/p95/p99 and requests per second. The server must use the same database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000")
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--todos", type=int, default=2000, help="Todos per user.")
+        parser.add_argument("--categories", type=int, default=50, help="Categories per user.")
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--mix", type=json.loads, default=DEFAULT_MIX, help='e.g. \'{"list": 1, "create": 1}\'')
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--baseline-dir", type=Path, default=settings.BASE_DIR / "benchmarks")
+        parser.add_argument("--save", metavar="NAME", help="Save the results as a baseline.")
+        parser.add_argument("--compare", metavar="NAME", help="Compare the results with a saved baseline.")
+        parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown, as a fraction.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Seeding {options['users']} users with {options['todos']} todos each...")
+        users = seed_users("benchmark", options["users"], options["todos"], options["categories"], "benchmark123")
+        results = run_mix(
+            options["base_url"], users, options["mix"], options["requests"], options["concurrency"], options["seed"]
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}: {result['rps']:.1f} req/s, {result['errors']} errors "
+                + " ".join(f"{key}={result[key]:.2f}ms" for key in ("p50", "p95", "p99"))
+            )
+
+        baseline_dir = options["baseline_dir"]
+        if options["save"]:
+            path = baseline_dir / f"{options['save']}.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            options_saved = {key: options[key] for key in ("users", "todos", "categories", "requests", "concurrency")}
+            baseline = {
+                "commit": self.current_commit(),
+                "created_at": timezone.now().isoformat(),
+                "database": settings.DATABASES["default"]["ENGINE"],
+                "options": {**options_saved, "mix": options["mix"]},
+                "results": results,
+            }
+            path.write_text(json.dumps(baseline, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Saved the baseline to {path}."))
+
+        if options["compare"]:
+            path = baseline_dir / f"{options['compare']}.json"
+            if not path.exists():
+                raise CommandError(f"No baseline at {path}.")
+            baseline = json.loads(path.read_text())
+            regressions = compare_results(baseline["results"], results, options["threshold"])
+            if regressions:
+                raise CommandError(
+                    f"Slower than the baseline from {baseline['commit'] or 'an unknown commit'}:\n"
+                    + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {path}."))
+
+    def current_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
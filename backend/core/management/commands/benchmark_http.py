@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from core.benchmarks import seed_user, login, load_test
+from core.models import Todo
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the todo endpoints of a running server, e.g. to compare the WSGI and ASGI deployments. "
+        "The server must use the same database as this command."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000")
+        parser.add_argument("--todos", type=int, default=2000)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--username", default="benchmark")
+        parser.add_argument("--password", default="benchmark123")
+
+    def handle(self, *args, **options):
+        user = seed_user(options["username"], options["todos"])
+        user.set_password(options["password"])
+        user.save()
+        headers = login(options["base_url"], options["username"], options["password"])
+
+        todo = Todo.objects.filter(owner=user).first()
+        endpoints = {
+            "todo list": "/api/todos/",
+            "todo list (filtered)": "/api/todos/?is_completed=false&search=report",
+            "todo detail": f"/api/todos/{todo.id}/",
+            "category list": "/api/categories/",
+        }
+        for name, path in endpoints.items():
+            results = load_test(options["base_url"] + path, headers, options["requests"], options["concurrency"])
+            self.stdout.write(
+                f"{name}: {results['rps']:.1f} req/s "
+                + " ".join(f"{key}={value:.2f}ms" for key, value in results.items() if key != "rps")
+            )
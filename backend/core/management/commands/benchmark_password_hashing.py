@@ -0,0 +1,39 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+from core.benchmarks import measure
+from core.passwords import TunedArgon2PasswordHasher
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the time to check a password and the logins per second per core with Django's PBKDF2 and Argon2 "
+        "hashers and the tuned Argon2 hasher, then the logins per second of a pool of hashing threads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--threads", type=int, default=settings.PASSWORD_HASHING_THREADS)
+        parser.add_argument("--logins", type=int, default=200, help="Logins checked by the thread pool.")
+
+    def handle(self, *args, **options):
+        hashers = {
+            "pbkdf2": PBKDF2PasswordHasher(),
+            "argon2 (Django)": Argon2PasswordHasher(),
+            "argon2 (tuned)": TunedArgon2PasswordHasher(),
+        }
+        password = "correct horse battery staple"
+        for name, hasher in hashers.items():
+            encoded = hasher.encode(password, hasher.salt())
+            timings = measure(lambda: hasher.verify(password, encoded), options["repeat"])
+            with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+                started = time.perf_counter()
+                list(executor.map(lambda _: hasher.verify(password, encoded), range(options["logins"])))
+                pool_rate = options["logins"] / (time.perf_counter() - started)
+            self.stdout.write(
+                f"{name}: {1000 / timings['p50']:.1f} logins/s per core, "
+                f"{pool_rate:.1f} logins/s with {options['threads']} threads "
+                + " ".join(f"{key}={value:.2f}ms" for key, value in timings.items())
+            )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from core.benchmarks import seed_user, measure
+from core.compression import COMPRESSORS
+from core.models import Todo
+from core.renderers import ORJSONRenderer
+from core.serializers import TodoValuesSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a todo account and report the render time and size of todo list payloads with each JSON "
+        "renderer, and their size and compression time with each encoding."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[20, 500, 5000])
+        parser.add_argument("--username", default="benchmark")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Seeding {max(options['sizes'])} todos for {options['username']}...")
+        user = seed_user(options["username"], max(options["sizes"]))
+        rows = Todo.objects.filter(owner=user).values(*TodoValuesSerializer.values)
+        renderers = {"json": JSONRenderer(), "orjson": ORJSONRenderer()}
+
+        for size in options["sizes"]:
+            data = TodoValuesSerializer(rows[:size], many=True).data
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{size} todos"))
+            for name, renderer in renderers.items():
+                timings = measure(lambda: renderer.render(data), options["repeat"])
+                self.stdout.write(
+                    f"{name}: {len(renderer.render(data))} bytes "
+                    + " ".join(f"{key}={value:.2f}ms" for key, value in timings.items())
+                )
+            content = renderers["orjson"].render(data)
+            for encoding, compress in COMPRESSORS.items():
+                timings = measure(lambda: compress(content), options["repeat"])
+                self.stdout.write(
+                    f"{encoding}: {len(compress(content))} bytes "
+                    + " ".join(f"{key}={value:.2f}ms" for key, value in timings.items())
+                )
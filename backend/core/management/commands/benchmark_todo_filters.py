@@ -0,0 +1,62 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from core.benchmarks import seed_user, measure
+from core.filters import TodoFilter
+from core.models import Todo, Category
+
+
+class Command(BaseCommand):
+    help = "Seed a large todo account and report query plans and latency for common TodoFilter combinations."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--todos", type=int, default=1_000_000)
+        parser.add_argument("--username", default="benchmark")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--compare", action="store_true", help="Also run every case with the Todo indexes dropped.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Seeding {options['todos']} todos for {options['username']}...")
+        user = seed_user(options["username"], options["todos"])
+
+        self.run_cases(user, options["repeat"], "with indexes")
+        if options["compare"]:
+            with self.without_indexes():
+                self.run_cases(user, options["repeat"], "without indexes")
+
+    def cases(self, user):
+        last_month = (timezone.now() - timedelta(days=30)).date().isoformat()
+        return {
+            "owner, ordered": {},
+            "is_completed": {"is_completed": "false"},
+            "created_at range": {"created_at_after": last_month},
+            "is_completed + created_at range": {"is_completed": "true", "created_at_after": last_month},
+            "description": {"description": "report"},
+            "category": {"category": str(Category.objects.get(owner=user, name="Category 1").id)},
+            "category name": {"category_name": "Category 1"},
+        }
+
+    def run_cases(self, user, repeat, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{label}"))
+        for name, params in self.cases(user).items():
+            queryset = TodoFilter(params, queryset=Todo.objects.filter(owner=user)).qs[:20]
+            timings = measure(lambda: list(queryset.all()), repeat)
+            self.stdout.write(
+                self.style.SUCCESS(f"\n{name} {params}: ")
+                + " ".join(f"{key}={value:.2f}ms" for key, value in timings.items())
+            )
+            self.stdout.write(queryset.explain())
+
+    @contextmanager
+    def without_indexes(self):
+        with connection.schema_editor() as editor:
+            for index in Todo._meta.indexes:
+                editor.remove_index(Todo, index)
+        try:
+            yield
+        finally:
+            with connection.schema_editor() as editor:
+                for index in Todo._meta.indexes:
+                    editor.add_index(Todo, index)
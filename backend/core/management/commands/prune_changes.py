@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from core.models import Change
+
+
+class Command(BaseCommand):
+    help = "Delete change log entries older than the given number of days. Older sync tokens will get a 410."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = Change.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(f"Deleted {deleted} changes older than {options['days']} days.")
@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from core.models import Category
+from core.stats import rebuild_todo_stats, rebuild_category_stats
+
+
+class Command(BaseCommand):
+    help = "Recount the todo counters behind /api/todos/stats/, for every user or the given usernames."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+        user_ids = list(users.values_list("id", flat=True))
+        batch_size = options["batch_size"]
+        for offset in range(0, len(user_ids), batch_size):
+            batch = user_ids[offset : offset + batch_size]
+            rebuild_todo_stats(batch)
+            rebuild_category_stats(list(Category.objects.filter(owner_id__in=batch).values_list("id", flat=True)))
+        self.stdout.write(f"Rebuilt the todo counters of {len(user_ids)} users.")
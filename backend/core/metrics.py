@@ -0,0 +1,185 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from rest_framework import serializers
+from core.queries import inspect_queries
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+request_metrics = ContextVar("request_metrics", default=None)
+
+
+class Histogram:
+    # A Prometheus histogram kept in process memory. Each worker process exposes its own.
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+            counts[index] += 1
+            counts[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {labels: list(counts) for labels, counts in self.series.items()}
+        for labels, counts in sorted(series.items()):
+            pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(self.labels, labels)]
+            cumulative = 0
+            for bound, count in zip([*self.buckets, "+Inf"], counts):
+                cumulative += count
+                bucket = ",".join([*pairs, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket}}} {cumulative}")
+            lines.append(f"{self.name}_sum{{{','.join(pairs)}}} {counts[-1]}")
+            lines.append(f"{self.name}_count{{{','.join(pairs)}}} {cumulative}")
+        return lines
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+LABELS = ("route", "view", "method")
+REQUEST_DURATION = Histogram(
+    "todos_http_request_duration_seconds", "Request latency.", (*LABELS, "status"), DURATION_BUCKETS
+)
+DB_DURATION = Histogram("todos_http_request_db_duration_seconds", "Time spent in DB queries.", LABELS, DURATION_BUCKETS)
+DB_QUERIES = Histogram("todos_http_request_db_queries", "DB queries per request.", LABELS, QUERY_COUNT_BUCKETS)
+SERIALIZER_DURATION = Histogram(
+    "todos_http_request_serializer_duration_seconds", "Time spent serializing.", LABELS, DURATION_BUCKETS
+)
+HISTOGRAMS = [REQUEST_DURATION, DB_DURATION, DB_QUERIES, SERIALIZER_DURATION]
+
+
+class RequestMetrics:
+    __slots__ = ("started", "queries", "db_time", "serializer_time", "serializing", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = self.serializer_time = 0.0
+        self.serializing = False
+        # The statements and their durations, kept for core.queries when QUERY_INSPECTION is on.
+        self.statements = [] if settings.QUERY_INSPECTION else None
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection (see CoreConfig.ready), so queries run by sync_to_async threads are counted
+    # for the request too.
+    metrics = request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        metrics.queries += 1
+        metrics.db_time += duration
+        if metrics.statements is not None:
+            metrics.statements.append((sql, duration))
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_data(prop):
+    @wraps(prop.fget)
+    def data(serializer):
+        metrics = request_metrics.get()
+        # Serializers that use another serializer's data are only timed once.
+        if metrics is None or metrics.serializing:
+            return prop.fget(serializer)
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return prop.fget(serializer)
+        finally:
+            metrics.serializing = False
+            metrics.serializer_time += time.perf_counter() - started
+
+    return property(data)
+
+
+def instrument_serializers():
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        if not hasattr(serializer_class.data.fget, "__wrapped__"):
+            serializer_class.data = timed_data(serializer_class.data)
+
+
+class PerformanceMiddleware:
+    # Records the latency, DB queries, DB time and serializer time of every request, reports them in a
+    # Server-Timing header and adds them to the histograms served by the metrics view.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = request_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_metrics.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        # Streamed responses are measured until the view returns, before their content is sent.
+        duration = time.perf_counter() - metrics.started
+        match = request.resolver_match
+        labels = (match.route, match.view_name, request.method) if match else ("", "", request.method)
+        REQUEST_DURATION.observe((*labels, str(response.status_code)), duration)
+        DB_DURATION.observe(labels, metrics.db_time)
+        DB_QUERIES.observe(labels, metrics.queries)
+        SERIALIZER_DURATION.observe(labels, metrics.serializer_time)
+        if metrics.statements is not None:
+            inspect_queries(f"{request.method} {match.route if match else request.path}", metrics.statements)
+
+        timings = [
+            f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"',
+            f"serializer;dur={metrics.serializer_time * 1000:.2f}",
+            f"total;dur={duration * 1000:.2f}",
+        ]
+        if "Server-Timing" in response.headers:
+            timings.insert(0, response.headers["Server-Timing"])
+        response.headers["Server-Timing"] = ", ".join(timings)
+        return response
+
+
+def metrics_view(request):
+    # Prometheus scrape endpoint, only answered for the addresses in METRICS_ALLOWED_IPS.
+    if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    lines = [line for histogram in HISTOGRAMS for line in histogram.render()]
+    return HttpResponse("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_alter_category_options"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["owner", "created_at", "id"], name="core_todo_owner_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="todo",
+            index=models.Index(
+                fields=["owner", "is_completed", "created_at"],
+                name="core_todo_owner_completed_idx",
+            ),
+        ),
+    ]
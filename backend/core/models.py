@@ -8,15 +8,24 @@ class Todo(models.Model):
     category = models.ManyToManyField("Category", blank=True)
     owner = models.ForeignKey("auth.User", on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_owner_id = instance.__dict__.get("owner_id")
+        instance._loaded_is_completed = instance.__dict__.get("is_completed")
+        return instance
 
     def clean(self):
-        if self.pk:
-            for category in self.category.all():
-                if category.owner != self.owner:
-                    raise ValidationError("All categories must belong to the todo owner.")
+        if self.pk and self.category.exclude(owner_id=self.owner_id).exists():
+            raise ValidationError("All categories must belong to the todo owner.")
 
     def save(self, *args, **kwargs):
-        self.clean()
+        # Categories are validated when they are set, so only an owner change can break the rule here.
+        owner_id = self.__dict__.get("owner_id")
+        if owner_id != getattr(self, "_loaded_owner_id", owner_id):
+            self.clean()
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -24,11 +33,16 @@ class Todo(models.Model):
 
     class Meta:
         ordering = ("created_at",)
+        indexes = [
+            models.Index(fields=["owner", "created_at", "id"], name="core_todo_owner_created_idx"),
+            models.Index(fields=["owner", "is_completed", "created_at"], name="core_todo_owner_completed_idx"),
+        ]
 
 
 class Category(models.Model):
     name = models.CharField(max_length=50)
     owner = models.ForeignKey("auth.User", on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.name
@@ -37,3 +51,40 @@ class Category(models.Model):
         verbose_name_plural = "Categories"
         unique_together = ("name", "owner")
         ordering = ("name",)
+
+
+class Change(models.Model):
+    # Log of writes to a user's todos and categories, read by the change feed.
+    ACTIONS = [("created", "Created"), ("updated", "Updated"), ("deleted", "Deleted")]
+
+    owner = models.ForeignKey("auth.User", on_delete=models.CASCADE)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    created_at = models.DateTimeField(auto_now_add=True, editable=False)
+
+    def __str__(self) -> str:
+        return f"{self.model} {self.object_id} {self.action}"
+
+    class Meta:
+        ordering = ("id",)
+        indexes = [models.Index(fields=["owner", "id"], name="core_change_owner_id_idx")]
+
+
+class TodoStats(models.Model):
+    # Todo counters of a user, kept up to date by core.signals and the bulk writes (see core.stats).
+    owner = models.OneToOneField("auth.User", on_delete=models.CASCADE, primary_key=True, related_name="todo_stats")
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.owner} {self.completed}/{self.total}"
+
+
+class CategoryStats(models.Model):
+    category = models.OneToOneField("Category", on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.category} {self.completed}/{self.total}"
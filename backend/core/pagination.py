@@ -0,0 +1,112 @@
+import base64
+import json
+from datetime import datetime
+from functools import partial, reduce
+from operator import or_
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetOrPageNumberPagination(PageNumberPagination):
+    # A `cursor` query parameter (empty for the first page) switches to keyset pagination over the
+    # view's `keyset_ordering`, which avoids the COUNT and OFFSET of page number pagination.
+    cursor_query_param = "cursor"
+    keyset_ordering = ("created_at", "id")
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_keyset = self.cursor_query_param in request.query_params
+        if not self.use_keyset:
+            return super().paginate_queryset(queryset, request, view)
+        queryset = self.get_keyset_queryset(queryset, request, view)
+        return None if queryset is None else self.set_keyset_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # paginate_queryset for async views, with the count and rows fetched by the async ORM.
+        self.use_keyset = self.cursor_query_param in request.query_params
+        if self.use_keyset:
+            queryset = self.get_keyset_queryset(queryset, request, view)
+            return None if queryset is None else self.set_keyset_page([row async for row in queryset])
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def get_keyset_queryset(self, queryset, request, view):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.ordering = getattr(view, "keyset_ordering", self.keyset_ordering)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            position = self.decode_cursor(cursor, queryset.model, self.ordering)
+            queryset = queryset.filter(self.keyset_filter(self.ordering, position))
+        return queryset[: self.page_size + 1]
+
+    def set_keyset_page(self, rows):
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        if self.has_next:
+            # Rows are model instances, or dicts for views that read `.values()`.
+            last = self.page[-1]
+            get = last.get if isinstance(last, dict) else partial(getattr, last)
+            self.next_position = [get(field) for field in self.ordering]
+        else:
+            self.next_position = None
+        return self.page
+
+    def keyset_filter(self, ordering, position):
+        return reduce(
+            or_,
+            (
+                Q(**dict(zip(ordering[:index], position[:index])), **{f"{ordering[index]}__gt": position[index]})
+                for index in range(len(ordering))
+            ),
+        )
+
+    def encode_cursor(self, position):
+        # isoformat keeps the microseconds that DjangoJSONEncoder would truncate.
+        position = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, cursor, model, ordering):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if len(position) != len(ordering):
+                raise ValueError
+            return [model._meta.get_field(field).to_python(value) for field, value in zip(ordering, position)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.use_keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        if not self.use_keyset:
+            return super().get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "results": data})
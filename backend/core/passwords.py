@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import Argon2PasswordHasher, make_password, verify_password
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    # Argon2id with the ARGON2_* settings. The defaults are OWASP's minimum (19 MiB, 2 passes, 1 lane), a few
+    # times faster per login than Django's Argon2 or PBKDF2 defaults. Hashes made with other parameters or
+    # hashers are upgraded on the next login.
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
+
+
+executor_lock = threading.Lock()
+hashing_executor = None
+
+
+def get_hashing_executor():
+    # Bounded, so a burst of logins queues for PASSWORD_HASHING_THREADS threads instead of taking every
+    # thread of the event loop's default executor.
+    global hashing_executor
+    with executor_lock:
+        if hashing_executor is None:
+            hashing_executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_THREADS, thread_name_prefix="password-hashing"
+            )
+        return hashing_executor
+
+
+async def run_hashing(func, *args):
+    return await sync_to_async(func, thread_sensitive=False, executor=get_hashing_executor())(*args)
+
+
+async def aauthenticate_credentials(username, password):
+    # ModelBackend.authenticate for the async login, with the user read by the async ORM and every hash,
+    # including the upgrade of outdated hashes, computed in the hashing executor.
+    UserModel = get_user_model()
+    try:
+        user = await UserModel._default_manager.aget(**{UserModel.USERNAME_FIELD: username})
+    except UserModel.DoesNotExist:
+        # Hash anyway, so unknown usernames take as long to reject as wrong passwords.
+        await run_hashing(make_password, password)
+        return None
+    is_correct, must_update = await run_hashing(verify_password, password, user.password)
+    if not is_correct or not ModelBackend().user_can_authenticate(user):
+        return None
+    if must_update:
+        user.password = await run_hashing(make_password, password)
+        await user.asave(update_fields=["password"])
+    return user
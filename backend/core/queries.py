@@ -0,0 +1,45 @@
+import logging
+import re
+from collections import Counter
+from django.conf import settings
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+# Sent with the findings of every inspected request, see core/conftest.py.
+queries_inspected = Signal()
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+IN_LISTS = re.compile(r"\(\?(?:, \?)*\)")
+SPACES = re.compile(r"\s+")
+
+
+def normalize(sql):
+    # Statements that only differ in their parameters, including the length of IN lists, normalize the same.
+    return SPACES.sub(" ", IN_LISTS.sub("(...)", LITERALS.sub("?", sql))).strip()
+
+
+class QueryReport:
+    def __init__(self, label, statements):
+        self.label = label
+        self.count = len(statements)
+        counts = Counter(normalize(sql) for sql, _ in statements)
+        self.repeated = {sql: count for sql, count in counts.items() if count >= settings.QUERY_REPEAT_THRESHOLD}
+        self.slow = [(sql, duration) for sql, duration in statements if duration >= settings.SLOW_QUERY_THRESHOLD]
+
+    def __bool__(self):
+        return bool(self.repeated or self.slow)
+
+    def __str__(self):
+        lines = [f"{self.label}: {self.count} queries"]
+        lines += [f"  repeated {count} times (N+1?): {sql}" for sql, count in self.repeated.items()]
+        lines += [f"  slow ({duration * 1000:.1f}ms): {sql}" for sql, duration in self.slow]
+        return "\n".join(lines)
+
+
+def inspect_queries(label, statements):
+    report = QueryReport(label, statements)
+    if report:
+        logger.warning("%s", report)
+    queries_inspected.send(sender=QueryReport, report=report)
+    return report
@@ -0,0 +1,102 @@
+import random
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# Tokens, users and the change log are always read from the primary: a token or change created a moment ago
+# must be found even if the replicas lag behind.
+PRIMARY_MODELS = {
+    "knox.authtoken",
+    "auth.user",
+    "sessions.session",
+    "core.change",
+    "core.todostats",
+    "core.categorystats",
+}
+
+replica_reads = ContextVar("replica_reads", default=None)
+
+
+class ReplicaReads:
+    __slots__ = ("alias",)
+
+    def __init__(self, alias):
+        self.alias = alias
+
+
+def recent_writer_key(user_id):
+    return f"replica:recent-writer:{user_id}"
+
+
+def wrote(user_id):
+    # Called for every write to the user's todos and categories (see core.signals.owner_changed).
+    if settings.DATABASE_REPLICAS:
+        caches[settings.API_CACHE_ALIAS].set(recent_writer_key(user_id), True, timeout=settings.REPLICA_STICKY_SECONDS)
+
+
+def read_own_writes(user_id):
+    # Once the user is known, their reads stay on the primary for REPLICA_STICKY_SECONDS after they wrote, so
+    # they see their changes even if the replicas lag behind.
+    reads = replica_reads.get()
+    if reads is not None and reads.alias and caches[settings.API_CACHE_ALIAS].get(recent_writer_key(user_id)):
+        reads.alias = None
+
+
+class PrimaryReadsMixin:
+    # For views whose reads must agree with rows read or written on the primary, such as the delta sync,
+    # which looks up the todos of changes read from the primary, and the stats, which rebuild counters there.
+    def initial(self, request, *args, **kwargs):
+        reads = replica_reads.get()
+        if reads is not None:
+            reads.alias = None
+        super().initial(request, *args, **kwargs)
+
+
+class ReplicaRouter:
+    # Sends the reads of safe requests to one of DATABASE_REPLICAS, picked per request, and everything else
+    # to the primary.
+    def db_for_read(self, model, **hints):
+        reads = replica_reads.get()
+        if reads is None or reads.alias is None or model._meta.label_lower in PRIMARY_MODELS:
+            return None
+        return reads.alias
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def start(self, request):
+        replicas = settings.DATABASE_REPLICAS
+        alias = random.choice(replicas) if replicas and request.method in SAFE_METHODS else None
+        return replica_reads.set(ReplicaReads(alias))
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = self.start(request)
+        try:
+            return self.get_response(request)
+        finally:
+            replica_reads.reset(token)
+
+    async def __acall__(self, request):
+        token = self.start(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            replica_reads.reset(token)
@@ -1,9 +1,16 @@
+from collections import defaultdict
 from django.contrib.auth.models import User
 from django.forms import ValidationError
 from django.contrib.auth.password_validation import validate_password
+from django.db.models import Count, Q
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
+from rest_framework.authtoken.serializers import AuthTokenSerializer
+from core.changes import collect_changes
 from core.models import Todo, Category
 
+BULK_MAX_ITEMS = 1000
+
 
 class RegisterUserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -33,6 +40,15 @@ class RegisterUserSerializer(serializers.ModelSerializer):
         return user
 
 
+class CredentialsSerializer(AuthTokenSerializer):
+    # AuthTokenSerializer's fields alone, for the async login, which checks them with
+    # core.passwords.aauthenticate_credentials instead of authenticate().
+    invalid_message = _("Unable to log in with provided credentials.")
+
+    def validate(self, attrs):
+        return attrs
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -52,7 +68,121 @@ class TodoSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Todo
-        fields = ["id", "description", "is_completed", "category", "created_at"]
+        fields = ["id", "description", "is_completed", "category", "created_at", "updated_at"]
+
+    def __init__(self, *args, fields=None, expand=("category",), **kwargs):
+        # fields limits the output to some fields, and categories are listed by id unless they are expanded
+        # (see TodoFieldsSerializer).
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        if "category" not in expand and "category" in self.fields:
+            self.fields["category"] = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+
+class TodoFieldsSerializer(serializers.Serializer):
+    # ?fields= limits todo responses to a comma separated list of fields, where categories are listed by id
+    # unless ?expand=category nests them. Without ?fields=, every field is sent with nested categories.
+    fields = serializers.CharField(required=False)
+    expand = serializers.ChoiceField(choices=["category"], required=False)
+
+    def validate_fields(self, value):
+        names = {name.strip() for name in value.split(",")} - {""}
+        unknown = names - set(TodoSerializer.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+        if not names:
+            raise serializers.ValidationError("Select at least one field.")
+        return names
+
+    def validate(self, data):
+        if "fields" not in data:
+            return {"fields": None, "expand": ("category",)}
+        expand = ("category",) if data.get("expand") else ()
+        names = data["fields"] | set(expand)
+        return {"fields": tuple(name for name in TodoSerializer.Meta.fields if name in names), "expand": expand}
+
+
+class TodoValuesListSerializer(serializers.ListSerializer):
+    # Fetches the categories of every row in one query, grouped by todo.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.categories = None
+
+    def category_rows(self, rows):
+        return self.child.category_rows([row["id"] for row in rows])
+
+    async def aprefetch(self):
+        # Called by the async views, which can't run the categories query while serializing.
+        self.categories = self.child.group_categories([row async for row in self.category_rows(self.instance)])
+
+    def to_representation(self, data):
+        rows = list(data)
+        if self.categories is None:
+            self.categories = self.child.group_categories(self.category_rows(rows))
+        represent = self.child.represent
+        return [represent(row, self.categories.get(row["id"], [])) for row in rows]
+
+
+class TodoValuesSerializer(serializers.BaseSerializer):
+    # Read-only TodoSerializer for `.values(*TodoValuesSerializer.values)` rows. It builds the same data
+    # without model instances or a serializer field per value, which is most of the time spent on lists.
+    values = ("id", "description", "is_completed", "created_at", "updated_at")
+    datetime_field = serializers.DateTimeField()
+
+    class Meta:
+        list_serializer_class = TodoValuesListSerializer
+
+    def __init__(self, *args, fields=None, expand=("category",), **kwargs):
+        # Same fields and expand as TodoSerializer. Rows only need the id and the columns of these fields.
+        super().__init__(*args, **kwargs)
+        self.field_names = fields
+        self.expand = expand
+
+    def includes(self, name):
+        return self.field_names is None or name in self.field_names
+
+    def category_rows(self, todo_ids):
+        # Categories listed by id come from the m2m table alone, without joining the categories.
+        if not self.includes("category"):
+            return Category.objects.none()
+        if "category" in self.expand:
+            return Category.objects.filter(todo__in=todo_ids).values_list("todo", "id", "name")
+        through = Todo.category.through.objects.filter(todo__in=todo_ids)
+        return through.order_by("category_id").values_list("todo", "category")
+
+    def group_categories(self, category_rows):
+        categories = defaultdict(list)
+        expand = "category" in self.expand
+        for row in category_rows:
+            categories[row[0]].append({"id": row[1], "name": row[2]} if expand else row[1])
+        return categories
+
+    def represent(self, row, categories):
+        to_datetime = self.datetime_field.to_representation
+        if self.field_names is None:
+            return {
+                "id": row["id"],
+                "description": row["description"],
+                "is_completed": row["is_completed"],
+                "category": categories,
+                "created_at": to_datetime(row["created_at"]),
+                "updated_at": to_datetime(row["updated_at"]),
+            }
+        data = {}
+        for name in self.field_names:
+            if name == "category":
+                data[name] = categories
+            elif name in ("created_at", "updated_at"):
+                data[name] = to_datetime(row[name])
+            else:
+                data[name] = row[name]
+        return data
+
+    def to_representation(self, row):
+        categories = self.group_categories(self.category_rows([row["id"]]))
+        return self.represent(row, categories[row["id"]])
 
 
 class CreateTodoSerializer(serializers.ModelSerializer):
@@ -61,31 +191,113 @@ class CreateTodoSerializer(serializers.ModelSerializer):
         fields = ["description"]
 
     def create(self, validated_data):
-        return Todo.objects.create(**validated_data, owner=self.context["request"].user)
+        todo = Todo.objects.create(**validated_data, owner=self.context["request"].user)
+        # A new todo has no categories yet, so there is nothing to query for its representation.
+        todo._prefetched_objects_cache = {"category": Category.objects.none()}
+        return todo
 
     def to_representation(self, instance):
         return TodoSerializer(instance).data
 
 
 class UpdateTodoSerializer(serializers.ModelSerializer):
+    category = serializers.ListField(child=serializers.IntegerField(), required=False)
+
     class Meta:
         model = Todo
         fields = ["description", "is_completed", "category"]
 
     def validate_category(self, value):
-        for category in value:
-            if category.owner != self.context["request"].user:
-                raise serializers.ValidationError("All categories must belong to the todo owner.")
-        return value
+        # Checked by id with one aggregate query, instead of fetching each category and its owner.
+        ids = set(value)
+        counts = Category.objects.filter(id__in=ids).aggregate(
+            found=Count("id"), owned=Count("id", filter=Q(owner_id=self.context["request"].user.pk))
+        )
+        if counts["found"] < len(ids):
+            raise serializers.ValidationError("Invalid category id - object does not exist.")
+        if counts["owned"] < counts["found"]:
+            raise serializers.ValidationError("All categories must belong to the todo owner.")
+        return list(ids)
 
     def update(self, instance, validated_data):
         categories = validated_data.pop("category", None)
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        if categories is not None:
-            instance.category.set(categories)
-        instance.save()
+        with collect_changes():
+            if categories is not None:
+                instance.category.set(categories)
+            instance.save()
         return instance
 
     def to_representation(self, instance):
         return TodoSerializer(instance).data
+
+
+class BulkCreateTodoSerializer(serializers.ModelSerializer):
+    category = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Todo
+        fields = ["description", "is_completed", "category"]
+
+
+class BulkUpdateTodoSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField()
+    category = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Todo
+        fields = ["id", "description", "is_completed", "category"]
+        extra_kwargs = {"description": {"required": False}}
+
+
+class ImportTodoSerializer(serializers.ModelSerializer):
+    category = serializers.ListField(child=serializers.CharField(max_length=50), required=False)
+
+    class Meta:
+        model = Todo
+        fields = ["description", "is_completed", "category"]
+
+
+class ImportFileSerializer(serializers.Serializer):
+    FORMATS = ["ndjson", "csv"]
+
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=FORMATS, required=False)
+
+    def validate(self, data):
+        if "format" not in data:
+            extension = data["file"].name.rsplit(".", 1)[-1].lower()
+            if extension not in self.FORMATS:
+                raise serializers.ValidationError({"format": ["Unknown file type, set the format to ndjson or csv."]})
+            data["format"] = extension
+        return data
+
+
+class CategoryCountsSerializer(CategorySerializer):
+    todo_count = serializers.IntegerField(read_only=True)
+    open_count = serializers.IntegerField(read_only=True)
+
+    class Meta(CategorySerializer.Meta):
+        fields = ["id", "name", "todo_count", "open_count"]
+
+
+class CategoryListQuerySerializer(serializers.Serializer):
+    counts = serializers.BooleanField(required=False, default=False)
+
+
+class CategoryStatsSerializer(serializers.ModelSerializer):
+    total = serializers.IntegerField(source="stats.total")
+    completed = serializers.IntegerField(source="stats.completed")
+
+    class Meta:
+        model = Category
+        fields = ["id", "name", "total", "completed"]
+
+
+class SyncSerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, required=False)
+
+
+class BulkDeleteTodoSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
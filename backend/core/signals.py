@@ -0,0 +1,155 @@
+from functools import partial
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from knox.models import AuthToken
+from core.authentication import forget_tokens
+from core.cache import bump_user_version
+from core.changes import record_change
+from core.routers import wrote
+from core.models import Todo, Category, TodoStats, CategoryStats
+from core.stats import adjust_stats, adjust_todo_categories, collect_stats
+
+
+def owner_changed(owner_id):
+    # Bumped again after commit, so a response cached by a concurrent reader while the transaction was
+    # still open can't survive under the latest version.
+    bump_user_version(owner_id)
+    transaction.on_commit(partial(bump_user_version, owner_id))
+    wrote(owner_id)
+
+
+@receiver(post_save, sender=Todo)
+@receiver(post_save, sender=Category)
+def todo_or_category_saved(sender, instance, created, **kwargs):
+    owner_changed(instance.owner_id)
+    record_change(instance.owner_id, sender._meta.model_name, instance.pk, "created" if created else "updated")
+
+
+@receiver(post_delete, sender=Todo)
+@receiver(post_delete, sender=Category)
+def todo_or_category_deleted(sender, instance, origin=None, **kwargs):
+    owner_changed(instance.owner_id)
+    # Nobody is left to read the changes of a user that is being deleted.
+    if not isinstance(origin, User):
+        record_change(instance.owner_id, sender._meta.model_name, instance.pk, "deleted")
+
+
+@receiver(m2m_changed, sender=Todo.category.through)
+def todo_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._cleared_todo_ids = list(instance.todo_set.values_list("id", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    owner_changed(instance.owner_id)
+    if not reverse:
+        record_change(instance.owner_id, "todo", instance.pk, "updated")
+        return
+    todo_ids = instance.__dict__.pop("_cleared_todo_ids", []) if action == "post_clear" else pk_set
+    for todo_id in todo_ids:
+        record_change(instance.owner_id, "todo", todo_id, "updated")
+
+
+def stored_completed(todo):
+    # Counters follow the saved value, which differs from is_completed while an update is being applied.
+    return int(getattr(todo, "_loaded_is_completed", todo.is_completed))
+
+
+@receiver(post_save, sender=Todo)
+def todo_stats_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        adjust_stats("owner", instance.owner_id, 1, int(instance.is_completed))
+    elif update_fields is None or "is_completed" in update_fields:
+        delta = int(instance.is_completed) - stored_completed(instance)
+        if delta:
+            adjust_stats("owner", instance.owner_id, 0, delta)
+            adjust_todo_categories(instance.pk, delta)
+    instance._loaded_is_completed = instance.is_completed
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Category)
+def stats_created(sender, instance, created, raw=False, **kwargs):
+    # Counters of older users and of categories created in bulk (e.g. by imports) are created on first use.
+    if created and not raw:
+        if sender is User:
+            TodoStats.objects.create(owner=instance)
+        else:
+            CategoryStats.objects.create(category=instance)
+
+
+@receiver(pre_delete, sender=Todo)
+def todo_stats_deleting(sender, instance, origin=None, **kwargs):
+    # The category links are deleted before the todo. Bulk deletes prefetch them, so their counters are
+    # collected with the others; otherwise they are updated here with a subquery.
+    if isinstance(origin, User):
+        return
+    prefetched = getattr(instance, "_prefetched_objects_cache", {}).get("category")
+    if prefetched is not None:
+        instance._deleted_category_ids = [category.id for category in prefetched]
+    else:
+        completed = stored_completed(instance)
+        CategoryStats.objects.filter(category__todo=instance).update(
+            total=F("total") - 1, completed=F("completed") - completed
+        )
+
+
+@receiver(post_delete, sender=Todo)
+def todo_stats_deleted(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, User):
+        return
+    completed = stored_completed(instance)
+    with collect_stats():
+        adjust_stats("owner", instance.owner_id, -1, -completed)
+        for category_id in instance.__dict__.pop("_deleted_category_ids", []):
+            adjust_stats("category", category_id, -1, -completed)
+
+
+@receiver(m2m_changed, sender=Todo.category.through)
+def todo_category_stats_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._cleared_todo_stats = instance.todo_set.aggregate(
+            total=Count("id"), completed=Count("id", filter=Q(is_completed=True))
+        )
+    elif action == "pre_clear":
+        instance._cleared_category_ids = list(instance.category.values_list("id", flat=True))
+    elif action == "pre_remove":
+        # remove() sends every pk it was given, including ones that weren't linked, so only the existing
+        # links are counted out.
+        if reverse:
+            links = sender.objects.filter(category_id=instance.pk, todo_id__in=pk_set).values_list("todo_id")
+        else:
+            links = sender.objects.filter(todo_id=instance.pk, category_id__in=pk_set).values_list("category_id")
+        instance._removed_pks = {pk for (pk,) in links}
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if action == "post_remove":
+        pk_set = instance.__dict__.pop("_removed_pks", set())
+    sign = 1 if action == "post_add" else -1
+    with collect_stats():
+        if not reverse:
+            completed = stored_completed(instance)
+            category_ids = instance.__dict__.pop("_cleared_category_ids", []) if action == "post_clear" else pk_set
+            for category_id in category_ids:
+                adjust_stats("category", category_id, sign, sign * completed)
+            return
+        if action == "post_clear":
+            counts = instance.__dict__.pop("_cleared_todo_stats", {"total": 0, "completed": 0})
+        else:
+            counts = {"total": len(pk_set), "completed": Todo.objects.filter(id__in=pk_set, is_completed=True).count()}
+        adjust_stats("category", instance.pk, sign * counts["total"], sign * counts["completed"])
+
+
+@receiver(post_delete, sender=AuthToken)
+def token_deleted(sender, instance, **kwargs):
+    forget_tokens([instance.digest])
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which cached users don't need to be dropped for.
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    forget_tokens(instance.auth_token_set.values_list("digest", flat=True))
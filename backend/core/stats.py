@@ -0,0 +1,117 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from core.models import Todo, Category, TodoStats, CategoryStats
+
+pending_stats = ContextVar("pending_stats", default=None)
+
+
+def rebuild_todo_stats(owner_ids):
+    counts = dict.fromkeys(owner_ids, (0, 0))
+    rows = Todo.objects.filter(owner_id__in=owner_ids).values("owner_id")
+    for row in rows.annotate(total=Count("id"), completed=Count("id", filter=Q(is_completed=True))):
+        counts[row["owner_id"]] = row["total"], row["completed"]
+    TodoStats.objects.bulk_create(
+        [
+            TodoStats(owner_id=owner_id, total=total, completed=completed)
+            for owner_id, (total, completed) in counts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["owner"],
+        update_fields=["total", "completed"],
+    )
+
+
+def rebuild_category_stats(category_ids):
+    # Categories that were deleted in the meantime have no counters to rebuild.
+    counts = dict.fromkeys(Category.objects.filter(id__in=category_ids).values_list("id", flat=True), (0, 0))
+    rows = Todo.category.through.objects.filter(category_id__in=counts).values("category_id")
+    for row in rows.annotate(total=Count("id"), completed=Count("id", filter=Q(todo__is_completed=True))):
+        counts[row["category_id"]] = row["total"], row["completed"]
+    CategoryStats.objects.bulk_create(
+        [
+            CategoryStats(category_id=category_id, total=total, completed=completed)
+            for category_id, (total, completed) in counts.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["category"],
+        update_fields=["total", "completed"],
+    )
+
+
+STATS = {
+    "owner": (TodoStats, "owner_id", rebuild_todo_stats),
+    "category": (CategoryStats, "category_id", rebuild_category_stats),
+}
+
+
+def save_stats(deltas):
+    # One UPDATE per distinct delta. Counters that don't exist yet are rebuilt from the tables instead, so
+    # they are created on first use and already include the write being counted.
+    groups = defaultdict(list)
+    for (kind, object_id), delta in deltas.items():
+        if delta != (0, 0):
+            groups[kind, delta].append(object_id)
+    for (kind, (total, completed)), ids in groups.items():
+        model, field, rebuild = STATS[kind]
+        queryset = model.objects.filter(**{f"{field}__in": ids})
+        if queryset.update(total=F("total") + total, completed=F("completed") + completed) < len(ids):
+            rebuild(ids)
+
+
+def adjust_stats(kind, object_id, total, completed):
+    pending = pending_stats.get()
+    if pending is None:
+        save_stats({(kind, object_id): (total, completed)})
+        return
+    previous_total, previous_completed = pending.get((kind, object_id), (0, 0))
+    pending[kind, object_id] = previous_total + total, previous_completed + completed
+
+
+def adjust_todo_categories(todo_id, completed):
+    # The todo's categories are matched with a subquery, so a completed todo costs one UPDATE however many
+    # categories it has.
+    CategoryStats.objects.filter(category__todo=todo_id).update(completed=F("completed") + completed)
+
+
+@contextmanager
+def collect_stats():
+    # Counter changes made inside the block are summed per counter and saved when it exits.
+    if pending_stats.get() is not None:
+        yield
+        return
+    token = pending_stats.set({})
+    try:
+        yield
+        pending = pending_stats.get()
+    finally:
+        pending_stats.reset(token)
+    if pending:
+        save_stats(pending)
+
+
+def read_stats(user):
+    # Counters that are missing, e.g. for users created before they existed, are rebuilt on the first read.
+    stats = TodoStats.objects.filter(owner=user).first()
+    if stats is None:
+        rebuild_todo_stats([user.pk])
+        stats = TodoStats.objects.get(owner=user)
+    categories = list(Category.objects.filter(owner=user).select_related("stats"))
+    missing = [category.id for category in categories if not hasattr(category, "stats")]
+    if missing:
+        rebuild_category_stats(missing)
+        categories = list(Category.objects.filter(owner=user).select_related("stats"))
+    return stats, categories
+
+
+def annotate_todo_counts(categories):
+    # todo_count and open_count from the counters, in the same query as the categories. Categories without
+    # counters yet (e.g. created before they existed) are counted in a grouped subquery instead.
+    todos = Todo.category.through.objects.filter(category_id=OuterRef("pk")).values("category_id")
+    counted = todos.annotate(total=Count("id"), open=Count("id", filter=Q(todo__is_completed=False)))
+    return categories.annotate(
+        todo_count=Coalesce("stats__total", Subquery(counted.values("total")), 0),
+        open_count=Coalesce(F("stats__total") - F("stats__completed"), Subquery(counted.values("open")), 0),
+    )
@@ -1,9 +1,47 @@
+import asyncio
+import gzip
+import io
+import json
+import time
+import brotli
 import pytest
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from rest_framework import status
+from knox.models import AuthToken
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, identify_hasher
 from django.contrib.auth.models import User
-from core.models import Todo, Category
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, router
+from django.test import AsyncClient, AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from asgiref.sync import async_to_sync, sync_to_async
+from core.async_views import (
+    AsyncLoginView,
+    AsyncTodoListCreateView,
+    AsyncTodoDetailUpdateDestroyView,
+    AsyncTodoExportView,
+    AsyncChangeFeedView,
+)
+from core.authentication import ExpiryRefresher
+from core.benchmarks import compare_results
+from core.cache import get_cache, version_key
+from core.feed import InMemoryChannelLayer
+from core.models import Todo, Category, Change, TodoStats, CategoryStats
+from core.compression import accepted_encoding
+from core.passwords import aauthenticate_credentials
+from core.queries import normalize, queries_inspected
+from core.renderers import ORJSONRenderer
+from core.routers import recent_writer_key
+from core.serializers import TodoSerializer, TodoValuesSerializer
 
 
 @pytest.fixture
@@ -11,6 +49,12 @@ def api_client():
     return APIClient()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    for cache in caches.all():
+        cache.clear()
+
+
 ### Authentication Test Cases
 @pytest.mark.django_db
 def test_register_user(api_client):
@@ -200,3 +244,1260 @@ def test_delete_category(auth_client, category):
     response = auth_client.delete(url)
     assert response.status_code == status.HTTP_204_NO_CONTENT
     assert not Category.objects.filter(id=category.id).exists()
+
+
+@pytest.mark.django_db
+def test_todo_list_category_queries_do_not_grow_with_page(auth_client, user):
+    def create_todos(count):
+        for i in range(count):
+            todo = Todo.objects.create(description=f"Todo {i}", owner=user)
+            todo.category.set([Category.objects.create(name=f"Category {todo.id}", owner=user)])
+
+    url = reverse("todo-list-create")
+    auth_client.get(url)
+    create_todos(2)
+    with CaptureQueriesContext(connection) as small_page:
+        auth_client.get(url)
+    create_todos(15)
+    with CaptureQueriesContext(connection) as full_page:
+        response = auth_client.get(url)
+    assert len(response.data["results"]) == 17
+    assert all(len(todo["category"]) == 1 for todo in response.data["results"])
+    assert len(full_page) == len(small_page)
+
+
+@pytest.mark.django_db
+def test_todo_list_keyset_pagination(auth_client, user):
+    todos = [Todo.objects.create(description=f"Todo {i}", owner=user) for i in range(25)]
+    url = reverse("todo-list-create")
+
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get(url, {"cursor": ""})
+    assert response.status_code == status.HTTP_200_OK
+    assert "count" not in response.data
+    assert not any("COUNT(" in query["sql"] for query in queries)
+    assert [todo["id"] for todo in response.data["results"]] == [todo.id for todo in todos[:20]]
+
+    response = auth_client.get(response.data["next"])
+    assert [todo["id"] for todo in response.data["results"]] == [todo.id for todo in todos[20:]]
+    assert response.data["next"] is None
+
+
+@pytest.mark.django_db
+def test_todo_list_invalid_cursor(auth_client, todo):
+    response = auth_client.get(reverse("todo-list-create"), {"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_category_list_keyset_pagination(auth_client, user):
+    for i in range(21):
+        Category.objects.create(name=f"Category {i:02}", owner=user)
+    url = reverse("category-list-create")
+    first_page = auth_client.get(url, {"cursor": ""})
+    second_page = auth_client.get(first_page.data["next"])
+    assert [category["name"] for category in second_page.data["results"]] == ["Category 20"]
+    assert auth_client.get(url).data["count"] == 21
+
+
+@pytest.mark.django_db
+def test_search_todos_by_category_name(auth_client, user):
+    work = Category.objects.create(name="Work", owner=user)
+    errands = Category.objects.create(name="Work errands", owner=user)
+    tagged = Todo.objects.create(description="Send report", owner=user)
+    tagged.category.set([work, errands])
+    Todo.objects.create(description="Workout", owner=user)
+    Todo.objects.create(description="Buy milk", owner=user)
+
+    response = auth_client.get(reverse("todo-list-create"), {"search": "work"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["count"] == 2
+    assert sorted(todo["description"] for todo in response.data["results"]) == ["Send report", "Workout"]
+
+    response = auth_client.get(reverse("todo-list-create"), {"search": "work report"})
+    assert [todo["description"] for todo in response.data["results"]] == ["Send report"]
+
+
+### Bulk Todos Test Cases
+@pytest.mark.django_db
+def test_bulk_create_todos(auth_client, category, another_user):
+    foreign_category = Category.objects.create(name="Foreign", owner=another_user)
+    data = [
+        {"description": "First"},
+        {"description": "Second", "category": [category.id]},
+        {"description": "Third", "category": [foreign_category.id]},
+        {"is_completed": True},
+    ]
+    response = auth_client.post(reverse("todo-bulk"), data, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    results = response.data["results"]
+    assert [result["status"] for result in results] == [201, 201, 400, 400]
+    assert results[1]["todo"]["category"][0]["name"] == "Work"
+    assert results[2]["errors"]["category"] == ["All categories must belong to the todo owner."]
+    assert "description" in results[3]["errors"]
+    assert Todo.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_bulk_update_todos(auth_client, user, category, another_todo):
+    todos = [Todo.objects.create(description=f"Todo {i}", owner=user) for i in range(3)]
+    data = [{"id": todo.id, "is_completed": True} for todo in todos]
+    data += [{"id": todos[0].id, "category": [category.id]}, {"id": another_todo.id, "is_completed": True}]
+    response = auth_client.patch(reverse("todo-bulk"), data, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert [result["status"] for result in response.data["results"]] == [200, 200, 200, 400, 404]
+    assert Todo.objects.filter(owner=user, is_completed=True).count() == 3
+    assert not Todo.objects.get(id=another_todo.id).is_completed
+
+
+@pytest.mark.django_db
+def test_bulk_update_todo_categories(auth_client, todo, category):
+    data = [{"id": todo.id, "category": [category.id]}]
+    auth_client.get(reverse("todo-list-create"))
+    with CaptureQueriesContext(connection) as single:
+        auth_client.patch(reverse("todo-bulk"), data, format="json")
+    assert list(todo.category.all()) == [category]
+
+    todos = [Todo.objects.create(description=f"Todo {i}", owner=todo.owner) for i in range(10)]
+    data = [{"id": todo.id, "category": [category.id]} for todo in todos]
+    with CaptureQueriesContext(connection) as many:
+        response = auth_client.patch(reverse("todo-bulk"), data, format="json")
+    assert all(len(result["todo"]["category"]) == 1 for result in response.data["results"])
+    assert len(many) == len(single)
+
+
+@pytest.mark.django_db
+def test_bulk_delete_todos(auth_client, todo, another_todo):
+    response = auth_client.delete(reverse("todo-bulk"), {"ids": [todo.id, another_todo.id]}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert [result["status"] for result in response.data["results"]] == [204, 404]
+    assert not Todo.objects.filter(id=todo.id).exists()
+    assert Todo.objects.filter(id=another_todo.id).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_rejects_non_list_payload(auth_client):
+    response = auth_client.post(reverse("todo-bulk"), {"description": "Not a list"}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+### Cache Test Cases
+@pytest.mark.django_db
+def test_todo_list_is_cached(auth_client, todo):
+    url = reverse("todo-list-create")
+    auth_client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get(url)
+    assert response.data["results"][0]["description"] == "Example Todo"
+    assert not any("core_todo" in query["sql"] for query in queries)
+
+
+@pytest.mark.django_db
+def test_todo_list_cache_is_invalidated_by_writes(auth_client, todo, category):
+    url = reverse("todo-list-create")
+    auth_client.get(url)
+    auth_client.patch(reverse("todo-detail-update-destroy", args=[todo.id]), {"is_completed": True})
+    assert auth_client.get(url).data["results"][0]["is_completed"] is True
+
+    todo.category.add(category)
+    assert auth_client.get(url).data["results"][0]["category"][0]["name"] == "Work"
+
+    category.name = "Renamed"
+    category.save()
+    assert auth_client.get(url).data["results"][0]["category"][0]["name"] == "Renamed"
+
+    auth_client.patch(reverse("todo-bulk"), [{"id": todo.id, "description": "Bulk"}], format="json")
+    assert auth_client.get(url).data["results"][0]["description"] == "Bulk"
+
+    todo.delete()
+    assert auth_client.get(url).data["count"] == 0
+
+
+@pytest.mark.django_db
+def test_cached_lists_are_per_user_and_query(auth_client, user, todo, another_todo):
+    url = reverse("todo-list-create")
+    assert auth_client.get(url).data["count"] == 1
+    assert auth_client.get(url, {"search": "nothing"}).data["count"] == 0
+
+    category = Category.objects.create(name="Home", owner=user)
+    url = reverse("category-list-create")
+    assert auth_client.get(url).data["results"][0]["name"] == "Home"
+    category.delete()
+    assert auth_client.get(url).data["count"] == 0
+
+
+@pytest.mark.django_db
+def test_api_cache_can_be_disabled(auth_client, todo, settings):
+    settings.API_CACHE_ENABLED = False
+    url = reverse("todo-list-create")
+    response = auth_client.get(url)
+    assert not response.has_header("ETag")
+    Todo.objects.filter(id=todo.id).update(description="Unsignalled")
+    assert auth_client.get(url).data["results"][0]["description"] == "Unsignalled"
+
+
+### Conditional Requests Test Cases
+@pytest.mark.django_db
+def test_todo_list_not_modified(auth_client, todo):
+    url = reverse("todo-list-create")
+    response = auth_client.get(url)
+    etag = response["ETag"]
+
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["ETag"] == etag
+    assert not any("core_todo" in query["sql"] for query in queries)
+
+    assert auth_client.get(url, {"is_completed": "true"}, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+    Todo.objects.create(description="New Todo", owner=todo.owner)
+    assert auth_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_last_modified_waits_for_the_second_to_pass(auth_client, user, todo, monkeypatch):
+    url = reverse("todo-list-create")
+    written = 1_700_000_000
+    get_cache().set(version_key(user.pk), written * 1_000_000_000 + 200_000_000)
+    monkeypatch.setattr(time, "time", lambda: written + 0.5)
+    response = auth_client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(written))
+    assert response.status_code == status.HTTP_200_OK
+    assert not response.has_header("Last-Modified")
+
+    monkeypatch.setattr(time, "time", lambda: written + 1.5)
+    response = auth_client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(written))
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response["Last-Modified"] == http_date(written)
+
+
+@pytest.mark.django_db
+def test_category_detail_not_modified(auth_client, category):
+    url = reverse("category-detail-update-destroy", args=[category.id])
+    etag = auth_client.get(url)["ETag"]
+    assert auth_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_todo_update_if_match(auth_client, todo):
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    etag = auth_client.get(url)["ETag"]
+
+    response = auth_client.patch(url, {"is_completed": True}, HTTP_IF_MATCH=f'{etag[:-1]}-br"')
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+
+    response = auth_client.patch(url, {"description": "Stale"}, HTTP_IF_MATCH=etag)
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    response = auth_client.delete(url, HTTP_IF_MATCH=etag)
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert Todo.objects.get(id=todo.id).description == "Example Todo"
+
+
+### Write Path Query Budget Test Cases
+@pytest.mark.django_db
+def test_create_todo_query_budget(auth_client, django_assert_max_num_queries):
+    with django_assert_max_num_queries(6):
+        response = auth_client.post(reverse("todo-list-create"), {"description": "Budget"})
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.django_db
+def test_update_todo_categories_query_budget(auth_client, user, todo, django_assert_max_num_queries):
+    categories = [Category.objects.create(name=f"Category {i}", owner=user) for i in range(10)]
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    with django_assert_max_num_queries(12):
+        response = auth_client.patch(url, {"category": [category.id for category in categories]})
+    assert len(response.data["category"]) == 10
+    with django_assert_max_num_queries(12):
+        response = auth_client.patch(url, {"category": [categories[0].id], "description": "Budget"})
+    assert len(response.data["category"]) == 1
+
+
+@pytest.mark.django_db
+def test_update_todo_with_unknown_category(auth_client, todo):
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    response = auth_client.patch(url, {"category": [999]})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_delete_todo_query_budget(auth_client, todo, category, django_assert_max_num_queries):
+    todo.category.set([category])
+    with django_assert_max_num_queries(9):
+        response = auth_client.delete(reverse("todo-detail-update-destroy", args=[todo.id]))
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+@pytest.mark.django_db
+def test_todo_owner_change_validates_categories(todo, category, another_user):
+    todo.category.set([category])
+    todo = Todo.objects.get(id=todo.id)
+    todo.owner = another_user
+    with pytest.raises(DjangoValidationError):
+        todo.save()
+
+
+### Token Cache Test Cases
+@pytest.mark.django_db
+def test_token_lookup_is_cached(auth_client, todo):
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    auth_client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert not any("knox_authtoken" in query["sql"] for query in queries)
+
+
+@pytest.mark.django_db
+def test_logout_invalidates_cached_token(auth_client, todo):
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    auth_client.get(url)
+    assert auth_client.post(reverse("knox_logout")).status_code == status.HTTP_204_NO_CONTENT
+    assert auth_client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_deactivated_user_invalidates_cached_token(auth_client, user, todo):
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    auth_client.get(url)
+    user.is_active = False
+    user.save()
+    assert auth_client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_token_expiry_refreshed_in_batches(user, settings):
+    settings.AUTH_REFRESH_BATCH_SIZE = 2
+    refresher = ExpiryRefresher()
+    tokens = [AuthToken.objects.create(user, expiry=timedelta(minutes=1))[0] for _ in range(2)]
+
+    with CaptureQueriesContext(connection) as queries:
+        refresher.touch(tokens[0].digest)
+    assert len(queries) == 0
+    with CaptureQueriesContext(connection) as queries:
+        refresher.touch(tokens[1].digest)
+    assert len(queries) == 1
+    assert all(token.expiry < AuthToken.objects.get(digest=token.digest).expiry for token in tokens)
+
+
+### Async Views Test Cases
+def call_async_view(view_class, client, path, **kwargs):
+    request = AsyncRequestFactory().get(path, headers={"Authorization": client._credentials["HTTP_AUTHORIZATION"]})
+    response = async_to_sync(view_class.as_view())(request, **kwargs)
+    return response.render()
+
+
+@pytest.mark.django_db
+def test_async_todo_list_matches_sync_view(auth_client, user, category):
+    for i in range(25):
+        Todo.objects.create(description=f"Todo {i}", owner=user).category.set([category])
+    url = reverse("todo-list-create")
+    for params in ("", "?page=2", "?cursor=", "?search=Todo 1", "?fields=id,category", "?fields=id&expand=category"):
+        expected = auth_client.get(url + params).json()
+        caches["default"].clear()
+        response = call_async_view(AsyncTodoListCreateView, auth_client, url + params)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.has_header("ETag")
+        assert json.loads(response.content) == expected
+
+
+@pytest.mark.django_db
+def test_async_todo_detail(auth_client, todo, another_todo):
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    response = call_async_view(AsyncTodoDetailUpdateDestroyView, auth_client, url, pk=todo.id)
+    assert json.loads(response.content) == auth_client.get(url).json()
+
+    url = reverse("todo-detail-update-destroy", args=[another_todo.id])
+    response = call_async_view(AsyncTodoDetailUpdateDestroyView, auth_client, url, pk=another_todo.id)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_async_todo_list_requires_authentication(todo):
+    request = AsyncRequestFactory().get(reverse("todo-list-create"))
+    response = async_to_sync(AsyncTodoListCreateView.as_view())(request).render()
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+def test_async_todo_list_delegates_writes(auth_client):
+    request = AsyncRequestFactory().post(
+        reverse("todo-list-create"),
+        {"description": "Async"},
+        content_type="application/json",
+        headers={"Authorization": auth_client._credentials["HTTP_AUTHORIZATION"]},
+    )
+    response = async_to_sync(AsyncTodoListCreateView.as_view())(request).render()
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Todo.objects.filter(description="Async").exists()
+
+
+### Change Feed Test Cases
+def parse_event(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.decode().strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+async def open_change_feed(client, **headers):
+    headers = {"Authorization": client._credentials["HTTP_AUTHORIZATION"], **headers}
+    request = AsyncRequestFactory().get(reverse("todo-change-feed"), headers=headers)
+    return await AsyncChangeFeedView.as_view()(request)
+
+
+@pytest.mark.django_db
+def test_changes_are_recorded(user, category):
+    todo = Todo.objects.create(description="Recorded", owner=user)
+    todo.category.add(category)
+    todo.delete()
+    changes = Change.objects.filter(owner=user).values_list("model", "action")
+    assert list(changes) == [
+        ("category", "created"),
+        ("todo", "created"),
+        ("todo", "updated"),
+        ("todo", "deleted"),
+    ]
+
+
+@pytest.mark.django_db
+def test_change_feed_resumes_from_last_event_id(auth_client, user, category, settings):
+    settings.CHANGE_FEED_MAX_DURATION = 0
+    last_event_id = Change.objects.latest("id").id
+    todo = Todo.objects.create(description="Resumed", owner=user)
+    todo.category.set([category])
+    auth_client.patch(reverse("todo-bulk"), [{"id": todo.id, "is_completed": True}], format="json")
+    Todo.objects.create(description="Deleted", owner=user).delete()
+
+    async def read_feed():
+        response = await open_change_feed(auth_client, **{"Last-Event-ID": str(last_event_id)})
+        return [parse_event(chunk) async for chunk in response.streaming_content]
+
+    events = async_to_sync(read_feed)()
+    assert [event for event, _ in events] == [
+        "todo.created",
+        "todo.updated",
+        "todo.updated",
+        "todo.created",
+        "todo.deleted",
+    ]
+    assert events[0][1]["todo"]["category"][0]["name"] == "Work"
+    assert events[2][1]["todo"]["is_completed"] is True
+    assert events[4][1]["todo"] is None
+
+
+@pytest.mark.django_db
+def test_change_feed_streams_new_changes(auth_client, user, settings, django_capture_on_commit_callbacks):
+    settings.CHANGE_FEED_HEARTBEAT = 60
+
+    def create_todo():
+        with django_capture_on_commit_callbacks(execute=True):
+            Todo.objects.create(description="Live", owner=user)
+
+    async def read_feed():
+        response = await open_change_feed(auth_client)
+        content = response.streaming_content
+        next_event = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0.1)
+        await sync_to_async(create_todo)()
+        event = await asyncio.wait_for(next_event, timeout=5)
+        await content.aclose()
+        return parse_event(event)
+
+    event, data = async_to_sync(read_feed)()
+    assert event == "todo.created"
+    assert data["todo"]["description"] == "Live"
+
+
+@pytest.mark.django_db
+def test_change_feed_rejects_invalid_last_event_id(auth_client):
+    response = async_to_sync(open_change_feed)(auth_client, **{"Last-Event-ID": "latest"}).render()
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_change_feed_is_refused_under_wsgi(auth_client):
+    response = auth_client.get(reverse("todo-change-feed"))
+    assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+
+def test_in_memory_channel_layer():
+    layer = InMemoryChannelLayer()
+
+    async def publish_and_receive():
+        async with layer.subscribe("changes.1") as queue:
+            await sync_to_async(layer.publish, thread_sensitive=False)("changes.1", {"type": "changes"})
+            layer.publish("changes.2", {"type": "changes"})
+            message = await asyncio.wait_for(queue.get(), timeout=1)
+            return message, queue.empty()
+
+    assert async_to_sync(publish_and_receive)() == ({"type": "changes"}, True)
+    assert not layer.subscribers
+
+
+### Delta Sync Test Cases
+@pytest.fixture
+def settled_changes(settings):
+    # Changes count as committed right away, so tokens move up to the latest change.
+    settings.SYNC_OVERLAP_SECONDS = 0
+
+
+@pytest.mark.django_db
+def test_full_sync_returns_sync_token(auth_client, todo, category, another_todo, settled_changes):
+    response = auth_client.get(reverse("todo-changes"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["sync_token"] == Change.objects.latest("id").id
+    assert response.data["has_more"] is False
+    assert [item["id"] for item in response.data["todos"]] == [todo.id]
+    assert [item["id"] for item in response.data["categories"]] == [category.id]
+
+
+@pytest.mark.django_db
+def test_delta_sync(auth_client, user, todo, category, settled_changes):
+    since = auth_client.get(reverse("todo-changes")).data["sync_token"]
+    created = Todo.objects.create(description="New", owner=user)
+    todo.description = "Renamed"
+    todo.save()
+    Todo.objects.create(description="Short lived", owner=user).delete()
+    category_id = category.id
+    category.delete()
+
+    response = auth_client.get(reverse("todo-changes"), {"since": since})
+    assert response.status_code == status.HTTP_200_OK
+    assert sorted(item["description"] for item in response.data["todos"]) == ["New", "Renamed"]
+    assert response.data["categories"] == []
+    assert len(response.data["deleted"]["todos"]) == 1
+    assert response.data["deleted"]["categories"] == [category_id]
+    assert created.id not in response.data["deleted"]["todos"]
+
+    response = auth_client.get(reverse("todo-changes"), {"since": response.data["sync_token"]})
+    assert response.data["todos"] == [] and response.data["deleted"] == {"todos": [], "categories": []}
+
+
+@pytest.mark.django_db
+def test_delta_sync_in_batches(auth_client, user, monkeypatch, settled_changes):
+    from core.views import TodoChangesView
+
+    monkeypatch.setattr(TodoChangesView, "batch_size", 2)
+    since = auth_client.get(reverse("todo-changes")).data["sync_token"]
+    for index in range(3):
+        Todo.objects.create(description=f"Todo {index}", owner=user)
+
+    response = auth_client.get(reverse("todo-changes"), {"since": since})
+    assert response.data["has_more"] is True
+    assert len(response.data["todos"]) == 2
+    response = auth_client.get(reverse("todo-changes"), {"since": response.data["sync_token"]})
+    assert response.data["has_more"] is False
+    assert [item["description"] for item in response.data["todos"]] == ["Todo 2"]
+
+
+@pytest.mark.django_db
+def test_delta_sync_expired_token(auth_client, user, todo, settled_changes):
+    since = auth_client.get(reverse("todo-changes")).data["sync_token"]
+    Todo.objects.create(description="Pruned", owner=user)
+    Todo.objects.create(description="Kept", owner=user)
+    Change.objects.filter(id__lte=since + 1).delete()
+
+    response = auth_client.get(reverse("todo-changes"), {"since": since})
+    assert response.status_code == status.HTTP_410_GONE
+    assert auth_client.get(reverse("todo-changes"), {"since": "latest"}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_delta_sync_survives_pruning_of_other_users_changes(auth_client, user, another_todo, settled_changes):
+    Change.objects.filter(owner=user).delete()
+    since = auth_client.get(reverse("todo-changes")).data["sync_token"]
+    assert since == Change.objects.latest("id").id
+    Change.objects.all().delete()
+
+    response = auth_client.get(reverse("todo-changes"), {"since": since})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["sync_token"] == since
+
+    Todo.objects.create(description="Pruned", owner=another_todo.owner)
+    Todo.objects.create(description="Kept", owner=another_todo.owner)
+    Change.objects.filter(id__lte=since + 1).delete()
+    response = auth_client.get(reverse("todo-changes"), {"since": since})
+    assert response.status_code == status.HTTP_410_GONE
+    since = auth_client.get(reverse("todo-changes")).data["sync_token"]
+    assert auth_client.get(reverse("todo-changes"), {"since": since}).status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_delta_sync_sends_recent_changes_again(auth_client, user, todo):
+    url = reverse("todo-changes")
+    since = auth_client.get(url).data["sync_token"]
+    assert since == Change.objects.earliest("id").id - 1
+    Todo.objects.create(description="Recent", owner=user)
+    for _ in range(2):
+        response = auth_client.get(url, {"since": since})
+        assert [item["description"] for item in response.data["todos"]] == ["Example Todo", "Recent"]
+        assert response.data["sync_token"] == since
+
+    Change.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+    response = auth_client.get(url, {"since": since})
+    assert response.data["sync_token"] == Change.objects.latest("id").id
+    assert auth_client.get(url, {"since": response.data["sync_token"]}).data["todos"] == []
+
+
+@pytest.mark.django_db
+def test_bulk_update_sets_updated_at(auth_client, todo):
+    before = todo.updated_at
+    auth_client.patch(reverse("todo-bulk"), [{"id": todo.id, "is_completed": True}], format="json")
+    todo.refresh_from_db()
+    assert todo.updated_at > before
+
+
+### Export Test Cases
+def read_export(response):
+    return b"".join(response.streaming_content).decode()
+
+
+@pytest.mark.django_db
+def test_export_ndjson(auth_client, user, category, another_todo):
+    for i in range(5):
+        Todo.objects.create(description=f"Todo {i}", owner=user, is_completed=i % 2 == 0).category.set([category])
+
+    response = auth_client.get(reverse("todo-export"), {"format": "ndjson", "is_completed": "true"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response["Content-Type"] == "application/x-ndjson; charset=utf-8"
+    assert response["Content-Disposition"] == 'attachment; filename="todos.ndjson"'
+    rows = [json.loads(line) for line in read_export(response).splitlines()]
+    assert [row["description"] for row in rows] == ["Todo 0", "Todo 2", "Todo 4"]
+    assert rows[0]["category"] == [{"id": category.id, "name": "Work"}]
+
+
+@pytest.mark.django_db
+def test_export_json_matches_list(auth_client, user, category):
+    for i in range(15):
+        Todo.objects.create(description=f"Todo {i}", owner=user).category.set([category])
+
+    response = auth_client.get(reverse("todo-export"), {"format": "json"})
+    listed = auth_client.get(reverse("todo-list-create"), {"cursor": ""}).json()["results"]
+    assert json.loads(read_export(response)) == listed
+
+
+@pytest.mark.django_db
+def test_export_csv(auth_client, user, category):
+    todo = Todo.objects.create(description='Say "hi", then leave', owner=user)
+    todo.category.set([category, Category.objects.create(name="Home", owner=user)])
+
+    lines = read_export(auth_client.get(reverse("todo-export"), {"format": "csv"})).splitlines()
+    assert lines[0] == "id,description,is_completed,category,created_at,updated_at"
+    assert lines[1].startswith(f'{todo.id},"Say ""hi"", then leave",False,Home;Work,')
+
+
+@pytest.mark.django_db
+def test_export_queries_do_not_grow_with_rows(auth_client, user, category):
+    url = reverse("todo-export")
+    read_export(auth_client.get(url, {"format": "ndjson"}))
+    for i in range(20):
+        Todo.objects.create(description=f"Todo {i}", owner=user).category.set([category])
+    with CaptureQueriesContext(connection) as context:
+        read_export(auth_client.get(url, {"format": "ndjson"}))
+    assert len(context.captured_queries) == 2
+
+
+@pytest.mark.django_db
+def test_export_errors(auth_client):
+    assert auth_client.get(reverse("todo-export"), {"format": "xml"}).status_code == status.HTTP_404_NOT_FOUND
+    response = auth_client.get(reverse("todo-export"), {"format": "csv", "created_at_after": "soon"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "created_at" in response.json()
+    assert APIClient().get(reverse("todo-export"), {"format": "csv"}).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_export(auth_client, user, category):
+    for i in range(3):
+        Todo.objects.create(description=f"Todo {i}", owner=user).category.set([category])
+    expected = read_export(auth_client.get(reverse("todo-export"), {"format": "ndjson"}))
+
+    async def export():
+        headers = {"Authorization": auth_client._credentials["HTTP_AUTHORIZATION"]}
+        request = AsyncRequestFactory().get("/api/todos/export/?format=ndjson", headers=headers)
+        response = await AsyncTodoExportView.as_view()(request)
+        return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+    assert async_to_sync(export)() == expected
+
+
+### Import Test Cases
+def import_file(client, name, content, **data):
+    upload = SimpleUploadedFile(name, content.encode())
+    response = client.post(reverse("todo-import"), {"file": upload, **data}, format="multipart")
+    if response.status_code != status.HTTP_200_OK:
+        return response, None
+    return response, [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+
+@pytest.mark.django_db
+def test_import_ndjson(auth_client, user, category, another_user):
+    Category.objects.create(name="Home", owner=another_user)
+    content = "\n".join(
+        [
+            json.dumps({"description": "Buy milk", "category": ["Work", "Home"]}),
+            "",
+            json.dumps({"description": "Done", "is_completed": True}),
+            "{not json",
+            json.dumps({"is_completed": True}),
+        ]
+    )
+    response, events = import_file(auth_client, "todos.ndjson", content)
+    assert response["Content-Type"] == "application/x-ndjson; charset=utf-8"
+    assert events[0] == {"line": 4, "errors": {"non_field_errors": ["Invalid JSON."]}}
+    assert events[1]["line"] == 5 and "description" in events[1]["errors"]
+    assert events[-1] == {"processed": 4, "created": 2, "failed": 2, "done": True}
+
+    todo = Todo.objects.get(description="Buy milk")
+    home = Category.objects.get(name="Home", owner=user)
+    assert set(todo.category.all()) == {category, home}
+    assert Todo.objects.get(description="Done").is_completed
+    assert Change.objects.filter(owner=user, model="category", object_id=home.id, action="created").exists()
+
+
+@pytest.mark.django_db
+def test_import_csv_round_trip(auth_client, user, category):
+    todo = Todo.objects.create(description='Say "hi"', owner=user, is_completed=True)
+    todo.category.set([category])
+    exported = read_export(auth_client.get(reverse("todo-export"), {"format": "csv"}))
+    todo.delete()
+
+    response, events = import_file(auth_client, "export.txt", exported, format="csv")
+    assert events[-1] == {"processed": 1, "created": 1, "failed": 0, "done": True}
+    imported = Todo.objects.get(owner=user)
+    assert (imported.description, imported.is_completed) == ('Say "hi"', True)
+    assert list(imported.category.all()) == [category]
+
+
+@pytest.mark.django_db
+def test_import_in_batches(auth_client, user, monkeypatch):
+    monkeypatch.setattr("core.importing.IMPORT_BATCH_SIZE", 10)
+    rows = "".join(f"Todo {i},false,Category {i % 3}\n" for i in range(25))
+    with CaptureQueriesContext(connection) as context:
+        response, events = import_file(auth_client, "todos.csv", "description,is_completed,category\n" + rows)
+    assert [event["processed"] for event in events] == [10, 20, 25, 25]
+    assert Todo.objects.filter(owner=user).count() == 25
+    assert Category.objects.filter(owner=user).count() == 3
+    inserts = [query for query in context.captured_queries if query["sql"].startswith('INSERT INTO "core_todo"')]
+    assert len(inserts) == 3
+
+
+@pytest.mark.django_db
+def test_import_rejects_unknown_format(auth_client):
+    response, _ = import_file(auth_client, "todos.xlsx", "description\nBuy milk\n")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "format" in response.data
+
+
+### Stats Test Cases
+def expected_stats(user):
+    todos = Todo.objects.filter(owner=user)
+    return {
+        "total": todos.count(),
+        "completed": todos.filter(is_completed=True).count(),
+        "categories": [
+            {
+                "id": category.id,
+                "name": category.name,
+                "total": todos.filter(category=category).count(),
+                "completed": todos.filter(category=category, is_completed=True).count(),
+            }
+            for category in Category.objects.filter(owner=user)
+        ],
+    }
+
+
+@pytest.mark.django_db
+def test_stats_follow_writes(auth_client, user, todo, category):
+    home = Category.objects.create(name="Home", owner=user)
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    auth_client.patch(url, {"category": [category.id, home.id]})
+    auth_client.patch(url, {"is_completed": True, "category": [home.id]})
+    auth_client.post(reverse("todo-list-create"), {"description": "New"})
+    category.todo_set.add(*Todo.objects.filter(owner=user))
+    home.todo_set.clear()
+    results = auth_client.post(
+        reverse("todo-bulk"), [{"description": "Bulk", "is_completed": True, "category": [home.id]}], format="json"
+    ).data["results"]
+    bulk_id = results[0]["todo"]["id"]
+    auth_client.patch(
+        reverse("todo-bulk"), [{"id": bulk_id, "is_completed": False, "category": [category.id]}], format="json"
+    )
+    auth_client.patch(reverse("todo-bulk"), [{"id": todo.id, "is_completed": False}], format="json")
+    import_file(auth_client, "todos.ndjson", json.dumps({"description": "Imported", "category": ["Home", "Errands"]}))
+    Todo.objects.get(description="New").delete()
+    auth_client.delete(reverse("todo-bulk"), {"ids": [bulk_id]}, format="json")
+
+    response = auth_client.get(reverse("todo-stats"))
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == expected_stats(user)
+    assert response.data["total"] == 2
+
+
+@pytest.mark.django_db
+def test_stats_read_is_constant(auth_client, user, category, django_assert_num_queries):
+    for i in range(10):
+        Todo.objects.create(description=f"Todo {i}", owner=user, is_completed=i < 4).category.set([category])
+    auth_client.get(reverse("todo-stats"))
+    with django_assert_num_queries(2):
+        response = auth_client.get(reverse("todo-stats"))
+    assert (response.data["total"], response.data["completed"]) == (10, 4)
+    assert response.data["categories"] == [{"id": category.id, "name": "Work", "total": 10, "completed": 4}]
+
+
+@pytest.mark.django_db
+def test_removing_unlinked_categories_keeps_stats(auth_client, user, todo, another_todo, category):
+    home = Category.objects.create(name="Home", owner=user)
+    todo.category.set([category])
+    todo.category.remove(home)
+    home.todo_set.remove(todo, another_todo)
+    category.todo_set.remove(todo, another_todo)
+    todo.category.add(home)
+    assert auth_client.get(reverse("todo-stats")).data == expected_stats(user)
+    assert CategoryStats.objects.get(category=home).total == 1
+    assert CategoryStats.objects.get(category=category).total == 0
+
+
+@pytest.mark.django_db
+def test_missing_stats_are_rebuilt(auth_client, user, todo, category):
+    todo.category.set([category])
+    TodoStats.objects.all().delete()
+    CategoryStats.objects.all().delete()
+    assert auth_client.get(reverse("todo-stats")).data == expected_stats(user)
+
+
+@pytest.mark.django_db
+def test_rebuild_todo_stats_command(user, todo, category):
+    todo.category.set([category])
+    TodoStats.objects.filter(owner=user).update(total=42)
+    CategoryStats.objects.filter(category=category).update(completed=7)
+    out = io.StringIO()
+    call_command("rebuild_todo_stats", stdout=out)
+    assert (TodoStats.objects.get(owner=user).total, CategoryStats.objects.get(category=category).completed) == (1, 0)
+    assert "1 users" in out.getvalue()
+
+
+### Metrics Test Cases
+def server_timing(response):
+    return dict(
+        (name.strip(), params)
+        for name, _, params in (part.partition(";") for part in response["Server-Timing"].split(","))
+    )
+
+
+@pytest.mark.django_db
+def test_server_timing_header(auth_client, todo):
+    auth_client.get(reverse("todo-list-create"))
+    with CaptureQueriesContext(connection) as context:
+        response = auth_client.get(reverse("todo-list-create"), {"page": 1})
+    timing = server_timing(response)
+    assert timing.keys() == {"db", "serializer", "total"}
+    assert f'desc="{len(context.captured_queries)} queries"' in timing["db"]
+    assert float(timing["serializer"].removeprefix("dur=")) > 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_server_timing_counts_async_queries(auth_client, todo):
+    headers = {"Authorization": auth_client._credentials["HTTP_AUTHORIZATION"]}
+    response = async_to_sync(AsyncClient().get)(reverse("todo-list-create"), headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert 'desc="0 queries"' not in server_timing(response)["db"]
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint(auth_client, todo, settings):
+    assert auth_client.get(reverse("metrics")).status_code == status.HTTP_404_NOT_FOUND
+    settings.METRICS_ALLOWED_IPS = ["127.0.0.1"]
+    auth_client.get(reverse("todo-detail-update-destroy", args=[todo.id]))
+    body = auth_client.get(reverse("metrics")).content.decode()
+    labels = 'route="api/todos/<int:pk>/",view="todo-detail-update-destroy",method="GET"'
+    assert f'todos_http_request_duration_seconds_bucket{{{labels},status="200",le="+Inf"}}' in body
+    assert f"todos_http_request_db_queries_count{{{labels}}}" in body
+    assert "# TYPE todos_http_request_serializer_duration_seconds histogram" in body
+
+    response = auth_client.get(reverse("metrics"), REMOTE_ADDR="10.0.0.1")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+### Query Inspection Test Cases
+def test_normalize_sql():
+    assert normalize("SELECT * FROM t WHERE a = 1 AND b = 'x''y'") == normalize(
+        "SELECT * FROM t WHERE a = 22 AND b = 'z'"
+    )
+    assert normalize('SELECT "U0"."id" FROM t WHERE id IN (%s, %s)') == 'SELECT "U0"."id" FROM t WHERE id IN (...)'
+
+
+@pytest.mark.django_db
+@pytest.mark.no_n_plus_one
+@pytest.mark.query_budget(6)
+def test_todo_list_has_no_n_plus_one(auth_client, user, category):
+    for i in range(10):
+        Todo.objects.create(description=f"Todo {i}", owner=user).category.set([category])
+    for params in ({}, {"cursor": ""}, {"search": "Todo"}):
+        assert len(auth_client.get(reverse("todo-list-create"), params).data["results"]) == 10
+
+
+@pytest.mark.django_db
+def test_n_plus_one_is_detected(auth_client, user, category, monkeypatch, caplog):
+    for i in range(10):
+        Todo.objects.create(description=f"Todo {i}", owner=user).category.set([category])
+    monkeypatch.setattr("core.views.TodoListCreateView.values_serializer_class", None)
+    monkeypatch.setattr(
+        "core.views.TodoListCreateView.get_queryset", lambda view: Todo.objects.filter(owner=view.request.user)
+    )
+    reports = []
+
+    def collect(sender, report, **kwargs):
+        reports.append(report)
+
+    queries_inspected.connect(collect)
+    try:
+        auth_client.get(reverse("todo-list-create"))
+    finally:
+        queries_inspected.disconnect(collect)
+
+    [(sql, count)] = reports[-1].repeated.items()
+    assert count == 10 and '"core_todo_category"' in sql
+    assert "GET api/todos/: " in caplog.text and "N+1" in caplog.text
+
+
+@pytest.mark.django_db
+def test_slow_queries_are_logged(auth_client, todo, settings, caplog):
+    settings.SLOW_QUERY_THRESHOLD = 0
+    auth_client.get(reverse("todo-detail-update-destroy", args=[todo.id]))
+    assert "slow (" in caplog.text and 'FROM "core_todo"' in caplog.text
+
+
+### Benchmark Test Cases
+def test_compare_benchmark_results():
+    baseline = {"list": {"p95": 10.0, "rps": 100.0}, "login": {"p95": 200.0, "rps": 5.0}}
+    results = {
+        "list": {"p95": 10.5, "rps": 80.0},
+        "login": {"p95": 260.0, "rps": 5.0},
+        "create": {"p95": 50.0, "rps": 1.0},
+    }
+    assert compare_results(baseline, results, threshold=0.1) == [
+        "list: 100.0 -> 80.0 req/s",
+        "login: p95 200.00ms -> 260.00ms",
+    ]
+
+
+### Read Replica Test Cases
+@pytest.fixture
+def replica(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    return connections["replica"]
+
+
+def replica_queries(client, method, url, replica, **kwargs):
+    with CaptureQueriesContext(replica) as context:
+        response = getattr(client, method)(url, **kwargs)
+    return response, [query["sql"] for query in context.captured_queries]
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+def test_reads_go_to_replica(auth_client, todo, replica):
+    response, queries = replica_queries(auth_client, "get", reverse("todo-list-create"), replica)
+    assert response.status_code == status.HTTP_200_OK
+    assert any('FROM "core_todo"' in sql for sql in queries)
+    assert not any("knox_authtoken" in sql for sql in queries)
+
+    response, queries = replica_queries(auth_client, "get", reverse("todo-changes"), replica)
+    assert not any("core_change" in sql for sql in queries)
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+def test_writes_go_to_primary_and_reads_stick_to_it(auth_client, user, todo, replica, settings):
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    response, queries = replica_queries(auth_client, "patch", url, replica, data={"is_completed": True})
+    assert response.status_code == status.HTTP_200_OK
+    assert queries == []
+
+    response, queries = replica_queries(auth_client, "get", url, replica)
+    assert response.data["is_completed"] and queries == []
+
+    caches["default"].delete(recent_writer_key(user.id))
+    response, queries = replica_queries(auth_client, "get", url, replica)
+    assert queries
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+def test_sync_and_stats_read_from_primary(auth_client, todo, category, replica):
+    for name in ("todo-changes", "todo-stats"):
+        response, queries = replica_queries(auth_client, "get", reverse(name), replica)
+        assert response.status_code == status.HTTP_200_OK
+        assert queries == []
+
+
+@pytest.mark.django_db
+def test_replica_router_outside_requests(todo, settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    assert router.db_for_read(Todo) == "default"
+    assert router.db_for_write(Todo) == "default"
+
+
+### Values Serializer Test Cases
+@pytest.mark.django_db
+def test_todo_values_serializer_matches_todo_serializer(user, category):
+    other = Category.objects.create(name="Another", owner=user)
+    Todo.objects.create(description="No categories", owner=user)
+    Todo.objects.create(description="One", owner=user, is_completed=True).category.set([category])
+    Todo.objects.create(description="Two", owner=user).category.set([category, other])
+    todos = Todo.objects.filter(owner=user).prefetch_related("category")
+    rows = Todo.objects.filter(owner=user).values(*TodoValuesSerializer.values)
+
+    with CaptureQueriesContext(connection) as queries:
+        data = TodoValuesSerializer(rows, many=True).data
+    assert len(queries) == 2
+    assert json.dumps(data) == json.dumps(TodoSerializer(todos, many=True).data)
+    assert TodoValuesSerializer(rows[2]).data == TodoSerializer(todos[2]).data
+
+
+@pytest.mark.django_db
+def test_todo_list_matches_model_serializer(auth_client, user, category, monkeypatch):
+    for i in range(25):
+        Todo.objects.create(description=f"Todo {i}", owner=user).category.set([category] if i % 2 else [])
+    url = reverse("todo-list-create")
+    params = ("", "?page=2", "?cursor=", "?search=Todo 1", "?is_completed=false")
+    fast = [auth_client.get(url + query).content for query in params]
+
+    caches["default"].clear()
+    monkeypatch.setattr("core.views.TodoListCreateView.values_serializer_class", None)
+    assert [auth_client.get(url + query).content for query in params] == fast
+
+
+### JSON Rendering and Compression Test Cases
+def test_orjson_renderer_matches_json_renderer():
+    data = {
+        "results": [{"id": 1, "description": "Café \u2028 ☕", "is_completed": False, "category": []}],
+        "created_at": datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=dt_timezone.utc),
+        1: None,
+    }
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+    indented = "application/json; indent=2"
+    assert ORJSONRenderer().render(data, indented) == JSONRenderer().render(data, indented)
+
+
+@pytest.mark.django_db
+def test_orjson_parser(auth_client):
+    url = reverse("todo-list-create")
+    response = auth_client.post(url, '{"description": "Caf\u00e9"}', content_type="application/json")
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["description"] == "Café"
+
+    response = auth_client.post(url, '{"description": ', content_type="application/json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data["detail"].startswith("JSON parse error")
+
+
+def test_accepted_encoding():
+    assert accepted_encoding("gzip, deflate, br") == "br"
+    assert accepted_encoding("gzip, br;q=0.5") == "gzip"
+    assert accepted_encoding("*") == "br"
+    assert accepted_encoding("deflate") is None
+    assert accepted_encoding("br;q=0, gzip;q=0") is None
+    assert accepted_encoding("") is None
+
+
+@pytest.mark.django_db
+def test_responses_are_compressed(auth_client, user, category):
+    for i in range(20):
+        Todo.objects.create(description=f"Todo {i}", owner=user).category.set([category])
+    url = reverse("todo-list-create")
+    content = auth_client.get(url).content
+
+    etag = auth_client.get(url)["ETag"]
+
+    for encoding, decompress in (("br", brotli.decompress), ("gzip", gzip.decompress)):
+        response = auth_client.get(url, HTTP_ACCEPT_ENCODING=encoding)
+        assert response["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response["Vary"]
+        assert int(response["Content-Length"]) == len(response.content) < len(content)
+        assert decompress(response.content) == content
+        assert response["ETag"] == f'{etag[:-1]}-{encoding}"'
+        response = auth_client.get(url, HTTP_ACCEPT_ENCODING=encoding, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = auth_client.get(reverse("todo-stats"), HTTP_ACCEPT_ENCODING="gzip")
+    assert not response.has_header("Content-Encoding")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_responses_are_compressed(auth_client, user):
+    for i in range(20):
+        Todo.objects.create(description=f"Todo {i}", owner=user)
+    headers = {"Authorization": auth_client._credentials["HTTP_AUTHORIZATION"], "Accept-Encoding": "br"}
+    response = async_to_sync(AsyncClient().get)(reverse("todo-list-create"), headers=headers)
+    assert response["Content-Encoding"] == "br"
+    assert json.loads(brotli.decompress(response.content))["count"] == 20
+
+
+### Sparse Fieldsets Test Cases
+@pytest.fixture
+def categorized_todos(user, category):
+    other = Category.objects.create(name="Another", owner=user)
+    todos = [Todo.objects.create(description=f"Todo {i}", owner=user) for i in range(5)]
+    todos[1].category.set([category])
+    todos[2].category.set([category, other])
+    return todos
+
+
+@pytest.mark.django_db
+def test_todo_list_sparse_fields(auth_client, categorized_todos):
+    url = reverse("todo-list-create")
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get(url, {"fields": "id,is_completed, description"})
+    assert response.status_code == status.HTTP_200_OK
+    assert [list(todo) for todo in response.data["results"]] == [["id", "description", "is_completed"]] * 5
+    assert not any("core_todo_category" in query["sql"] or "updated_at" in query["sql"] for query in queries)
+
+    todo = categorized_todos[2]
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get(url, {"fields": "id,category"})
+    category_ids = sorted(todo.category.values_list("id", flat=True))
+    assert response.data["results"][2] == {"id": todo.id, "category": category_ids}
+    assert not any('"core_category"' in query["sql"] for query in queries)
+    response = auth_client.get(url, {"fields": "id", "expand": "category"})
+    assert response.data["results"][2]["category"] == [
+        {"id": category.id, "name": category.name} for category in todo.category.order_by("name")
+    ]
+
+
+@pytest.mark.django_db
+def test_sparse_fields_match_model_serializer(auth_client, categorized_todos, monkeypatch):
+    url = reverse("todo-list-create")
+    params = [{}, {"fields": "id,category"}, {"fields": "description,created_at", "expand": "category"}]
+    params += [{"fields": "id,updated_at", "cursor": ""}, {"expand": "category"}]
+    fast = [auth_client.get(url, query).content for query in params]
+
+    caches["default"].clear()
+    monkeypatch.setattr("core.views.TodoListCreateView.values_serializer_class", None)
+    assert [auth_client.get(url, query).content for query in params] == fast
+
+
+@pytest.mark.django_db
+def test_todo_detail_sparse_fields(auth_client, categorized_todos):
+    todo = categorized_todos[2]
+    url = reverse("todo-detail-update-destroy", args=[todo.id])
+    response = auth_client.get(url, {"fields": "description,category"})
+    assert response.data == {"description": todo.description, "category": sorted(c.id for c in todo.category.all())}
+    response = auth_client.get(url, {"fields": "description", "expand": "category"})
+    assert [category["name"] for category in response.data["category"]] == ["Another", "Work"]
+
+    response = auth_client.patch(url + "?fields=id", {"is_completed": True})
+    assert response.status_code == status.HTTP_200_OK
+    assert "description" in response.data
+
+
+@pytest.mark.django_db
+def test_invalid_sparse_fields(auth_client, todo):
+    url = reverse("todo-list-create")
+    response = auth_client.get(url, {"fields": "id,owner"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data["fields"] == ["Unknown fields: owner."]
+    assert auth_client.get(url, {"fields": ","}).status_code == status.HTTP_400_BAD_REQUEST
+    assert auth_client.get(url, {"expand": "owner"}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+### Category Counts Test Cases
+@pytest.mark.django_db
+def test_category_list_counts(auth_client, user, categorized_todos):
+    work, other = Category.objects.get(name="Work"), Category.objects.get(name="Another")
+    Category.objects.create(name="Empty", owner=user)
+    categorized_todos[2].is_completed = True
+    categorized_todos[2].save()
+    CategoryStats.objects.filter(category=other).delete()
+
+    url = reverse("category-list-create")
+    auth_client.get(url, {"search": "Work"})
+    caches["default"].clear()
+    with CaptureQueriesContext(connection) as plain:
+        auth_client.get(url)
+    caches["default"].clear()
+    with CaptureQueriesContext(connection) as queries:
+        response = auth_client.get(url, {"counts": "true"})
+    assert len(queries) == len(plain)
+    assert [(c["name"], c["todo_count"], c["open_count"]) for c in response.data["results"]] == [
+        ("Another", 1, 0),
+        ("Empty", 0, 0),
+        ("Work", 2, 1),
+    ]
+    assert "todo_count" not in auth_client.get(url).data["results"][0]
+    assert auth_client.get(url, {"counts": "maybe"}).status_code == status.HTTP_400_BAD_REQUEST
+
+    with CaptureQueriesContext(connection) as queries:
+        auth_client.get(url, {"counts": "true"})
+    assert not any('"core_category"' in query["sql"] for query in queries)
+    Todo.objects.create(description="New", owner=user).category.set([work])
+    response = auth_client.get(url, {"counts": "true"})
+    assert response.data["results"][2]["todo_count"] == 3
+
+    Category.objects.create(name="Later", owner=user)
+    assert auth_client.head(url, {"counts": "true"}).status_code == status.HTTP_200_OK
+    assert "todo_count" in auth_client.get(url, {"counts": "true"}).data["results"][0]
+
+
+@pytest.mark.django_db
+def test_filter_todos_by_category_ids(auth_client, user, categorized_todos):
+    work, other = Category.objects.get(name="Work"), Category.objects.get(name="Another")
+    url = reverse("todo-list-create")
+    response = auth_client.get(url, {"category": f"{work.id},{other.id}"})
+    assert [todo["id"] for todo in response.data["results"]] == [categorized_todos[1].id, categorized_todos[2].id]
+    response = auth_client.get(url, {"category": other.id})
+    assert [todo["id"] for todo in response.data["results"]] == [categorized_todos[2].id]
+    response = auth_client.get(url, {"category_name": "anoth"})
+    assert [todo["id"] for todo in response.data["results"]] == [categorized_todos[2].id]
+    assert auth_client.get(url, {"category": "Work"}).status_code == status.HTTP_400_BAD_REQUEST
+
+
+### Password Hashing Test Cases
+def pbkdf2_user(username, password):
+    hasher = PBKDF2PasswordHasher()
+    return User.objects.create(username=username, password=hasher.encode(password, hasher.salt(), iterations=1000))
+
+
+def async_login(data):
+    request = AsyncRequestFactory().post(reverse("knox_login"), data, content_type="application/json")
+    request.session = SessionStore()
+    return async_to_sync(AsyncLoginView.as_view())(request).render()
+
+
+@pytest.mark.django_db
+def test_passwords_are_hashed_with_tuned_argon2(api_client):
+    api_client.post(reverse("register"), {"username": "new", "email": "new@email.com", "password": "testuser123"})
+    assert User.objects.get(username="new").password.startswith("argon2$argon2id$v=19$m=19456,t=2,p=1$")
+
+
+@pytest.mark.django_db
+def test_login_upgrades_outdated_hashes(api_client, settings):
+    pbkdf2_user("olduser", "oldpass123")
+    response = api_client.post(reverse("knox_login"), {"username": "olduser", "password": "oldpass123"})
+    assert response.status_code == status.HTTP_200_OK
+    assert identify_hasher(User.objects.get(username="olduser").password).algorithm == "argon2"
+
+    settings.ARGON2_TIME_COST = 3
+    api_client.post(reverse("knox_login"), {"username": "olduser", "password": "oldpass123"})
+    assert ",t=3," in User.objects.get(username="olduser").password
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_login(api_client):
+    pbkdf2_user("olduser", "oldpass123")
+    response = async_login({"username": "olduser", "password": "oldpass123"})
+    assert response.status_code == status.HTTP_200_OK
+    token = json.loads(response.content)["token"]
+    assert identify_hasher(User.objects.get(username="olduser").password).algorithm == "argon2"
+    api_client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+    assert api_client.get(reverse("todo-list-create")).status_code == status.HTTP_200_OK
+
+    expected = api_client.post(reverse("knox_login"), {"username": "olduser", "password": "wrong"}).json()
+    for data in ({"username": "olduser", "password": "wrong"}, {"username": "nobody", "password": "oldpass123"}):
+        response = async_login(data)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert json.loads(response.content) == expected
+    assert "password" in json.loads(async_login({"username": "olduser"}).content)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_authentication_rejects_inactive_users():
+    User.objects.create_user(username="inactive", password="testpass123", is_active=False)
+    assert async_to_sync(aauthenticate_credentials)("inactive", "testpass123") is None
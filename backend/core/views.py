@@ -1,18 +1,42 @@
+from datetime import timedelta
+from django.conf import settings
 from django.contrib.auth import login
+from django.db.models import Min, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import permissions, generics, status, filters
+from rest_framework import permissions, generics, status, filters, serializers
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.authtoken.serializers import AuthTokenSerializer
 from knox.views import LoginView as KnoxLoginView
-from knox.auth import TokenAuthentication
+from core.authentication import CachedTokenAuthentication
+from core.bulk import bulk_create_todos, bulk_update_todos, bulk_delete_todos
+from core.cache import CachedListMixin, ConditionalMixin
+from core.export import NDJSONExportRenderer, JSONExportRenderer, CSVExportRenderer, EXPORT_CHUNK_SIZE, dumps
+from core.importing import import_todos, read_rows
 from core.filters import TodoFilter
-from core.models import Todo, Category
+from core.pagination import KeysetOrPageNumberPagination
+from core.routers import PrimaryReadsMixin
+from core.search import TodoSearchFilter
+from core.stats import read_stats, annotate_todo_counts
+from core.models import Todo, Category, Change
 from core.serializers import (
     RegisterUserSerializer,
     TodoSerializer,
+    TodoValuesSerializer,
+    TodoFieldsSerializer,
     CreateTodoSerializer,
     UpdateTodoSerializer,
     CategorySerializer,
+    BulkDeleteTodoSerializer,
+    ImportFileSerializer,
+    CategoryStatsSerializer,
+    CategoryCountsSerializer,
+    CategoryListQuerySerializer,
+    SyncSerializer,
+    BULK_MAX_ITEMS,
 )
 
 
@@ -23,7 +47,9 @@ class LoginView(KnoxLoginView):
     def post(self, request, format=None):
         serializer = AuthTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        user = serializer.validated_data["user"]
+        return self.log_in(request, serializer.validated_data["user"])
+
+    def log_in(self, request, user):
         login(request, user)
         return super(LoginView, self).post(request, format=None)
 
@@ -38,52 +64,298 @@ class RegisterUserView(generics.CreateAPIView):
         return Response({"user": RegisterUserSerializer(user).data}, status=status.HTTP_201_CREATED)
 
 
-class TodoListCreateView(generics.ListCreateAPIView):
+class ValuesReadMixin:
+    # Views that set values_serializer_class (e.g. TodoValuesSerializer) read GET requests as `.values()` rows
+    # with it, instead of model instances with serializer_class.
+    values_serializer_class = None
+
+    def reads_values(self):
+        return self.values_serializer_class is not None and self.request.method in ("GET", "HEAD")
+
+    def get_serializer_class(self):
+        if self.reads_values():
+            return self.values_serializer_class
+        return super().get_serializer_class()
+
+    def get_values(self):
+        return self.values_serializer_class.values
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.reads_values():
+            return queryset.prefetch_related(None).values(*self.get_values())
+        return queryset
+
+
+class TodoFieldsMixin:
+    # Handles ?fields= and ?expand= on GET (see TodoFieldsSerializer), loading only the columns and categories
+    # the response needs.
+    def requested_fields(self):
+        if not hasattr(self, "_requested_fields"):
+            if self.request.method in ("GET", "HEAD"):
+                serializer = TodoFieldsSerializer(data=self.request.query_params)
+                serializer.is_valid(raise_exception=True)
+                self._requested_fields = serializer.validated_data
+            else:
+                self._requested_fields = {"fields": None, "expand": ("category",)}
+        return self._requested_fields
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method in ("GET", "HEAD"):
+            kwargs.update(self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_values(self):
+        fields = self.requested_fields()["fields"]
+        if fields is None:
+            return TodoValuesSerializer.values
+        # Keyset pagination reads the ordering columns of the last row.
+        names = {"id", *getattr(self, "keyset_ordering", ()), *fields}
+        return tuple(name for name in TodoValuesSerializer.values if name in names)
+
+    def select_fields(self, queryset):
+        requested = self.requested_fields()
+        fields, expand = requested["fields"], requested["expand"]
+        if fields is None:
+            return queryset.prefetch_related("category")
+        queryset = queryset.only(*self.get_values())
+        if "category" not in fields:
+            return queryset
+        if "category" in expand:
+            return queryset.prefetch_related("category")
+        return queryset.prefetch_related(Prefetch("category", queryset=Category.objects.only("id").order_by("id")))
+
+
+class TodoListCreateView(
+    TodoFieldsMixin, ValuesReadMixin, ConditionalMixin, CachedListMixin, generics.ListCreateAPIView
+):
+    cache_prefix = "todos"
+    serializer_class = TodoSerializer
+    values_serializer_class = TodoValuesSerializer
+
     def get_serializer_class(self):
         if self.request.method == "POST":
             return CreateTodoSerializer
-        return TodoSerializer
+        return super().get_serializer_class()
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    search_fields = ["description", "category__name"]
+    filter_backends = [DjangoFilterBackend, TodoSearchFilter]
     filterset_class = TodoFilter
+    pagination_class = KeysetOrPageNumberPagination
+    keyset_ordering = ("created_at", "id")
 
     def get_queryset(self):
-        return Todo.objects.filter(owner=self.request.user)
+        return self.select_fields(Todo.objects.filter(owner=self.request.user))
 
 
-class TodoDetailUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class TodoDetailUpdateDestroyView(TodoFieldsMixin, ConditionalMixin, generics.RetrieveUpdateDestroyAPIView):
     def get_serializer_class(self):
         if self.request.method == "PATCH":
             return UpdateTodoSerializer
         return TodoSerializer
 
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, TodoSearchFilter]
+    filterset_class = TodoFilter
+
+    def get_queryset(self):
+        queryset = Todo.objects.filter(owner=self.request.user)
+        if self.request.method == "GET":
+            return self.select_fields(queryset)
+        return queryset
+
+
+class TodoBulkView(generics.GenericAPIView):
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_items(self):
+        items = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=BULK_MAX_ITEMS)
+        return items.run_validation(self.request.data)
+
+    def post(self, request, *args, **kwargs):
+        return Response({"results": bulk_create_todos(request.user, self.get_items())})
+
+    def patch(self, request, *args, **kwargs):
+        return Response({"results": bulk_update_todos(request.user, self.get_items())})
+
+    def delete(self, request, *args, **kwargs):
+        serializer = BulkDeleteTodoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({"results": bulk_delete_todos(request.user, serializer.validated_data["ids"])})
+
+
+class TodoExportView(generics.GenericAPIView):
+    # Streams every todo matching the list filters as ?format=ndjson, csv or json. Rows are read with a
+    # server-side cursor and categories are prefetched per chunk, so memory doesn't grow with the account.
+    serializer_class = TodoSerializer
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    search_fields = ["description", "category__name"]
+    renderer_classes = [NDJSONExportRenderer, CSVExportRenderer, JSONExportRenderer]
+    filter_backends = [DjangoFilterBackend, TodoSearchFilter]
     filterset_class = TodoFilter
+    pagination_class = None
 
     def get_queryset(self):
-        return Todo.objects.filter(owner=self.request.user)
+        return Todo.objects.filter(owner=self.request.user).prefetch_related("category").order_by("created_at", "id")
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        rows = map(serializer.to_representation, queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+        return self.export_response(request.accepted_renderer.chunks(rows))
+
+    def export_response(self, chunks):
+        renderer = self.request.accepted_renderer
+        response = StreamingHttpResponse(chunks, content_type=f"{renderer.media_type}; charset={renderer.charset}")
+        response.headers["Content-Disposition"] = f'attachment; filename="todos.{renderer.format}"'
+        return response
 
+    def handle_exception(self, exc):
+        # Errors are rendered as JSON whatever the export format.
+        self.request.accepted_renderer = JSONRenderer()
+        self.request.accepted_media_type = JSONRenderer.media_type
+        return super().handle_exception(exc)
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+
+class TodoImportView(generics.GenericAPIView):
+    # Imports an NDJSON or CSV upload in batches and streams the progress back as NDJSON: an object with the
+    # line and errors for every invalid row, and the processed/created/failed counts after every batch.
+    serializer_class = ImportFileSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rows = read_rows(serializer.validated_data["file"], serializer.validated_data["format"])
+        events = (dumps(event) + "\n" for event in import_todos(request.user, rows))
+        return StreamingHttpResponse(events, content_type="application/x-ndjson; charset=utf-8")
+
+
+class TodoStatsView(PrimaryReadsMixin, ConditionalMixin, generics.GenericAPIView):
+    # Total, completed and per-category counts, read from the counters in core.stats instead of counting todos.
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        stats, categories = read_stats(request.user)
+        return Response(
+            {
+                "total": stats.total,
+                "completed": stats.completed,
+                "categories": CategoryStatsSerializer(categories, many=True).data,
+            }
+        )
+
+
+class TodoChangesView(PrimaryReadsMixin, generics.GenericAPIView):
+    # Delta sync: the todos and categories created, updated or deleted after the `since` token, read from
+    # the change log so the cost follows the number of changes. Without `since`, everything is returned.
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    batch_size = 1000
+
+    def get(self, request, *args, **kwargs):
+        serializer = SyncSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        since = serializer.validated_data.get("since")
+        changes = Change.objects.filter(owner=request.user)
+        oldest = Change.objects.aggregate(first=Min("id"))["first"]
+        settled = self.settled_position(oldest)
+
+        if since is None:
+            todos = Todo.objects.filter(owner=request.user).prefetch_related("category")
+            categories = Category.objects.filter(owner=request.user)
+            return self.sync_response(settled, False, todos, categories, {"todo": set(), "category": set()})
+
+        if oldest is not None and since + 1 < oldest:
+            # Changes after the token have been pruned, so the client has to start over with a full sync.
+            detail = "Sync token expired, sync again without `since`."
+            return Response({"detail": detail}, status=status.HTTP_410_GONE)
+
+        batch = list(changes.filter(id__gt=since)[: self.batch_size + 1])
+        has_more = len(batch) > self.batch_size
+        batch = batch[: self.batch_size]
+        changed, deleted = {"todo": set(), "category": set()}, {"todo": set(), "category": set()}
+        for change in batch:
+            added_to, removed_from = (deleted, changed) if change.action == "deleted" else (changed, deleted)
+            added_to[change.model].add(change.object_id)
+            removed_from[change.model].discard(change.object_id)
+
+        todos = list(Todo.objects.filter(owner=request.user, id__in=changed["todo"]).prefetch_related("category"))
+        categories = list(Category.objects.filter(owner=request.user, id__in=changed["category"]))
+        # Objects deleted after the last change in this batch are reported as deleted right away.
+        deleted["todo"] |= changed["todo"] - {todo.id for todo in todos}
+        deleted["category"] |= changed["category"] - {category.id for category in categories}
+        sync_token = batch[-1].id if has_more else max(settled, since)
+        return self.sync_response(sync_token, has_more, todos, categories, deleted)
+
+    def settled_position(self, oldest):
+        # Tokens are positions in the whole change log, so they move past other users' changes too and don't
+        # fall behind the pruned changes of users who haven't written in a while. A change only becomes visible
+        # when its transaction commits, possibly after changes with higher ids, so tokens stop before the
+        # changes of the last SYNC_OVERLAP_SECONDS, which are sent again on the next sync.
+        cutoff = timezone.now() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+        settled = Change.objects.filter(created_at__lte=cutoff).order_by("-id").values_list("id", flat=True).first()
+        if settled is None:
+            return oldest - 1 if oldest else 0
+        return settled
+
+    def sync_response(self, sync_token, has_more, todos, categories, deleted):
+        return Response(
+            {
+                "sync_token": sync_token,
+                "has_more": has_more,
+                "todos": TodoSerializer(todos, many=True).data,
+                "categories": CategorySerializer(categories, many=True).data,
+                "deleted": {"todos": sorted(deleted["todo"]), "categories": sorted(deleted["category"])},
+            }
+        )
+
+
+class ChangeFeedView(generics.GenericAPIView):
+    # Authentication and permissions for the change feed, which is streamed by core.async_views.
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+
+class CategoryListCreateView(ConditionalMixin, CachedListMixin, generics.ListCreateAPIView):
+    cache_prefix = "categories"
     serializer_class = CategorySerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter]
     search_fields = ["name"]
+    pagination_class = KeysetOrPageNumberPagination
+    keyset_ordering = ("name", "id")
+
+    def with_counts(self):
+        # ?counts=true adds the todo_count and open_count of every category.
+        if self.request.method not in ("GET", "HEAD"):
+            return False
+        serializer = CategoryListQuerySerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["counts"]
+
+    def get_serializer_class(self):
+        if self.with_counts():
+            return CategoryCountsSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
-        return Category.objects.filter(owner=self.request.user)
+        queryset = Category.objects.filter(owner=self.request.user)
+        if self.with_counts():
+            return annotate_todo_counts(queryset)
+        return queryset
 
 
-class CategoryDetailUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryDetailUpdateDestroyView(ConditionalMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = CategorySerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter]
     search_fields = ["name"]
@@ -10,10 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 import sys
 import dj_database_url
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 get_env = environ.Env()
 environ.Env.read_env()
@@ -52,12 +54,27 @@ INSTALLED_APPS = [
 ]
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("knox.auth.TokenAuthentication",),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("core.authentication.CachedTokenAuthentication",),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
 }
 
+# Render and parse JSON with orjson (see core/renderers.py) instead of the json module.
+if get_env.bool("ORJSON", default=True):
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = (
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    )
+    REST_FRAMEWORK["DEFAULT_PARSER_CLASSES"] = (
+        "core.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    )
+
 MIDDLEWARE = [
+    "core.metrics.PerformanceMiddleware",
+    "core.routers.ReplicaMiddleware",
+    "core.compression.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -88,24 +105,141 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "todos.wsgi.application"
 
+# Serve the todo and category GET endpoints with async views (see core/async_views.py). Only useful
+# when the project runs under an ASGI server, e.g. `uvicorn todos.asgi:application`.
+ASYNC_API = get_env.bool("ASYNC_API", default=False)
+
+# Change feed (see core/feed.py). Streams need ASGI; under WSGI a response is only sent once its stream
+# closes, so the feed answers 501 there. Streams close after CHANGE_FEED_MAX_DURATION seconds and clients
+# reconnect with Last-Event-ID.
+CHANGE_FEED_LAYER = "core.feed.InMemoryChannelLayer"
+CHANGE_FEED_HEARTBEAT = get_env.int("CHANGE_FEED_HEARTBEAT", default=15)
+CHANGE_FEED_MAX_DURATION = get_env.int("CHANGE_FEED_MAX_DURATION", default=300)
+
+# Delta sync tokens stop before the changes of the last SYNC_OVERLAP_SECONDS (see core/views.py), so changes
+# of transactions that commit after newer ones still reach the clients. Keep it above the longest bulk write.
+SYNC_OVERLAP_SECONDS = get_env.int("SYNC_OVERLAP_SECONDS", default=60)
+
+# Request metrics (see core/metrics.py), scraped by Prometheus from /metrics/ on these addresses only. Off by
+# default: behind a reverse proxy every request comes from the proxy's address, so scrape a worker directly
+# on an internal port instead of allowing the proxy.
+METRICS_ALLOWED_IPS = get_env.list("METRICS_ALLOWED_IPS", default=[])
+
+# Requests that run the same statement QUERY_REPEAT_THRESHOLD times (an N+1 pattern) or a statement slower
+# than SLOW_QUERY_THRESHOLD seconds are logged by core/queries.py.
+QUERY_INSPECTION = get_env.bool("QUERY_INSPECTION", default=True)
+QUERY_REPEAT_THRESHOLD = get_env.int("QUERY_REPEAT_THRESHOLD", default=5)
+SLOW_QUERY_THRESHOLD = get_env.float("SLOW_QUERY_THRESHOLD", default=0.1)
+
+# Responses of COMPRESSION_MIN_SIZE bytes or more are compressed with brotli or gzip (see core/compression.py).
+COMPRESSION_MIN_SIZE = get_env.int("COMPRESSION_MIN_SIZE", default=1024)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
 IS_TESTING = "pytest" in sys.modules
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before they are reused, instead of
+# connecting on every request. With DB_POOL, Postgres connections come from psycopg's pool instead, which
+# also suits ASGI, where every request may run in a different thread.
+DB_POOL = get_env.bool("DB_POOL", default=False)
+
 DATABASES = {
-    "default": dj_database_url.config(default=get_env("DATABASE_URL")),
+    "default": dj_database_url.config(
+        default=get_env("DATABASE_URL"),
+        conn_max_age=0 if DB_POOL else get_env.int("DB_CONN_MAX_AGE", default=60),
+        conn_health_checks=get_env.bool("DB_CONN_HEALTH_CHECKS", default=True),
+    ),
 }
 
+if DB_POOL:
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": get_env.int("DB_POOL_MIN_SIZE", default=2),
+        "max_size": get_env.int("DB_POOL_MAX_SIZE", default=10),
+        "timeout": get_env.int("DB_POOL_TIMEOUT", default=10),
+    }
+
+# Read replicas, e.g. DATABASE_REPLICA_URLS=postgres://replica1/todos,postgres://replica2/todos. Reads of
+# GET requests go to a replica, except for a user who wrote in the last REPLICA_STICKY_SECONDS (see
+# core/routers.py). That is tracked in the API cache, so replicas need a shared CACHE_URL outside DEBUG.
+for index, url in enumerate(get_env.list("DATABASE_REPLICA_URLS", default=[]), 1):
+    replica = dj_database_url.parse(
+        url,
+        conn_max_age=DATABASES["default"]["CONN_MAX_AGE"],
+        conn_health_checks=DATABASES["default"]["CONN_HEALTH_CHECKS"],
+    )
+    if replica["ENGINE"] == DATABASES["default"]["ENGINE"]:
+        replica["OPTIONS"] = dict(DATABASES["default"].get("OPTIONS", {}))
+    replica["TEST"] = {"MIRROR": "default"}
+    DATABASES[f"replica{index}"] = replica
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.routers.ReplicaRouter"]
+REPLICA_STICKY_SECONDS = get_env.int("REPLICA_STICKY_SECONDS", default=5)
+
 if IS_TESTING:
+    # The replica mirrors the test database and is only used by the tests that add it to DATABASE_REPLICAS.
     DATABASES = {
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": ":memory:",
         },
+        "replica": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+            "TEST": {"MIRROR": "default"},
+        },
     }
+    DATABASE_REPLICAS = []
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    "default": get_env.cache_url("CACHE_URL", default="locmemcache://?max_entries=10000"),
+    "auth": get_env.cache_url("AUTH_CACHE_URL", default="locmemcache://auth?max_entries=10000"),
+}
+
+API_CACHE_ALIAS = "default"
+API_CACHE_TIMEOUT = get_env.int("API_CACHE_TIMEOUT", default=300)
+# Cached lists and conditional requests rely on per-user versions that every process must see, so they are
+# off with a local memory cache outside DEBUG. Point CACHE_URL at a shared cache when running several workers.
+local_api_cache = CACHES[API_CACHE_ALIAS]["BACKEND"] == "django.core.cache.backends.locmem.LocMemCache"
+API_CACHE_ENABLED = get_env.bool("API_CACHE_ENABLED", default=DEBUG or not local_api_cache)
+# The reads of a user who just wrote stay on the primary through a flag in the same cache (see
+# core/routers.py), which a local memory cache would only show to the worker that took the write.
+if DATABASE_REPLICAS and local_api_cache and not DEBUG:
+    raise ImproperlyConfigured("DATABASE_REPLICA_URLS needs CACHE_URL to point to a shared cache, e.g. Redis.")
+
+AUTH_CACHE_ALIAS = "auth"
+AUTH_CACHE_TIMEOUT = get_env.int("AUTH_CACHE_TIMEOUT", default=60)
+AUTH_REFRESH_BATCH_SIZE = get_env.int("AUTH_REFRESH_BATCH_SIZE", default=100)
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.1/topics/auth/passwords/
+
+# PASSWORD_HASHER picks the hasher of new passwords, "argon2" (see core/passwords.py) or "pbkdf2". Passwords
+# hashed otherwise are upgraded when their users log in.
+PASSWORD_HASHER = get_env("PASSWORD_HASHER", default="argon2")
+ARGON2_TIME_COST = get_env.int("ARGON2_TIME_COST", default=2)
+ARGON2_MEMORY_COST = get_env.int("ARGON2_MEMORY_COST", default=19456)
+ARGON2_PARALLELISM = get_env.int("ARGON2_PARALLELISM", default=1)
+PASSWORD_HASHERS = [
+    "core.passwords.TunedArgon2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+if PASSWORD_HASHER == "pbkdf2":
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+elif PASSWORD_HASHER != "argon2":
+    raise ImproperlyConfigured(f'PASSWORD_HASHER must be "argon2" or "pbkdf2", not "{PASSWORD_HASHER}".')
 
+# Threads that hash passwords for the async login (see core.async_views.AsyncLoginView).
+PASSWORD_HASHING_THREADS = get_env.int("PASSWORD_HASHING_THREADS", default=os.cpu_count() or 1)
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -15,6 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 from knox import views as knox_views
@@ -23,16 +24,40 @@ from core.views import (
     RegisterUserView,
     TodoListCreateView,
     TodoDetailUpdateDestroyView,
+    TodoBulkView,
+    TodoExportView,
+    TodoImportView,
+    TodoStatsView,
+    TodoChangesView,
     CategoryListCreateView,
     CategoryDetailUpdateDestroyView,
 )
+from core.async_views import AsyncChangeFeedView
+from core.metrics import metrics_view
+
+if settings.ASYNC_API:
+    from core.async_views import (
+        AsyncLoginView as LoginView,
+        AsyncTodoListCreateView as TodoListCreateView,
+        AsyncTodoDetailUpdateDestroyView as TodoDetailUpdateDestroyView,
+        AsyncTodoExportView as TodoExportView,
+        AsyncCategoryListCreateView as CategoryListCreateView,
+        AsyncCategoryDetailUpdateDestroyView as CategoryDetailUpdateDestroyView,
+    )
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics/", metrics_view, name="metrics"),
     path("api/register/", RegisterUserView.as_view(), name="register"),
     path("api/login/", LoginView.as_view(), name="knox_login"),
     path("api/logout/", knox_views.LogoutView.as_view(), name="knox_logout"),
     path("api/todos/", TodoListCreateView.as_view(), name="todo-list-create"),
+    path("api/todos/bulk/", TodoBulkView.as_view(), name="todo-bulk"),
+    path("api/todos/export/", TodoExportView.as_view(), name="todo-export"),
+    path("api/todos/import/", TodoImportView.as_view(), name="todo-import"),
+    path("api/todos/stats/", TodoStatsView.as_view(), name="todo-stats"),
+    path("api/todos/changes/", TodoChangesView.as_view(), name="todo-changes"),
+    path("api/todos/feed/", AsyncChangeFeedView.as_view(), name="todo-change-feed"),
     path(
         "api/todos/<int:pk>/",
         TodoDetailUpdateDestroyView.as_view(),